@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from nxempowerment import grid_world
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import generate_grid_world
+
+from graphs import open_grid_map, street_like_graph
+
+GRID_WORLDS = [cls for cls in vars(grid_world).values()
+               if isinstance(cls, type) and issubclass(cls, grid_world.GridWorldGraph)
+               and cls is not grid_world.GridWorldGraph]
+# GridWorldGraph2Rooms builds its graph in graph() and has no map for graph_diag()
+GRID_GRAPHS = [pytest.param(gw, builder, id='{}-{}'.format(gw.__name__, builder))
+               for builder in ('graph', 'graph_diag') for gw in GRID_WORLDS
+               if builder == 'graph' or gw._map is not None]
+HORIZONS = list(range(1, 11))
+
+
+@pytest.mark.parametrize('num_steps', HORIZONS)
+@pytest.mark.parametrize('gw, builder', GRID_GRAPHS)
+def bench_grid_world(measure, gw, builder, num_steps):
+    graph = getattr(gw(), builder)()
+    measure(graph_node_empowerment, graph, num_steps)
+
+
+@pytest.mark.parametrize('method', ['frontier', 'bitset'])
+@pytest.mark.parametrize('num_steps', [3, 10])
+@pytest.mark.parametrize('size', [50, 150])
+def bench_scaled_grid(measure, size, num_steps, method):
+    compiled = compile_graph(generate_grid_world(open_grid_map(size), diagonals=True))
+    measure(graph_node_empowerment, compiled, num_steps, method=method)
+
+
+@pytest.mark.parametrize('method', ['frontier', 'bitset'])
+@pytest.mark.parametrize('num_steps', [3, 10])
+@pytest.mark.parametrize('size', [50, 150])
+def bench_street_like(measure, size, num_steps, method):
+    compiled = compile_graph(street_like_graph(size), distance='length')
+    measure(graph_node_empowerment, compiled, num_steps, method=method)
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from nxempowerment.compiled import compile_graph
+from nxempowerment.grid_world import generate_grid_world
+
+from graphs import open_grid_map
+
+
+@pytest.mark.parametrize('randomise_actions', [False, True])
+@pytest.mark.parametrize('diagonals', [False, True])
+@pytest.mark.parametrize('size', [50, 200])
+def bench_generate_grid_world(measure, size, diagonals, randomise_actions):
+    measure(generate_grid_world, open_grid_map(size), diagonals, randomise_actions, seed=0)
+
+
+@pytest.mark.parametrize('size', [50, 200])
+def bench_compile_grid_world(measure, size):
+    measure(compile_graph, generate_grid_world(open_grid_map(size), diagonals=True))
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import matplotlib
+matplotlib.use('Agg')
+
+import networkx as nx
+
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRooms, generate_grid_world
+from nxempowerment.visualize import plot_graph_with_measure
+
+from graphs import open_grid_map
+
+
+@pytest.mark.parametrize('fast', [False, True])
+@pytest.mark.parametrize('graph_name', ['six_rooms', 'grid_100'])
+def bench_plot_graph_with_measure(measure, tmp_path, graph_name, fast):
+    if graph_name == 'six_rooms':
+        graph = GridWorldSixRooms().graph()
+    else:
+        graph = generate_grid_world(open_grid_map(100))
+    nx.set_node_attributes(graph, graph_node_empowerment(graph, 3), '3_step_empowerment')
+    measure(plot_graph_with_measure, graph, '3_step_empowerment', tmp_path / 'plot.png', node_names=False,
+            fast=fast, node_size=20)
@@ -0,0 +1,22 @@
+import tracemalloc
+
+import pytest
+
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    Benchmark a function and record its peak traced memory in the extra_info of the benchmark.
+
+    The peak is measured in a separate untimed run so that tracing does not slow the timed rounds.
+    """
+    def run(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['peak_memory_bytes'] = peak
+        return benchmark(func, *args, **kwargs)
+    return run
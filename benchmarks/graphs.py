@@ -0,0 +1,27 @@
+import networkx as nx
+import numpy as np
+
+
+def open_grid_map(size: int, wall_fraction: float = 0.2, seed: int = 0) -> np.ndarray:
+    """A size x size grid world map with randomly placed walls"""
+    rng = np.random.default_rng(seed)
+    return (rng.random((size, size)) >= wall_fraction).astype(np.int64)
+
+
+def street_like_graph(size: int, seed: int = 0) -> nx.DiGraph:
+    """
+    A random planar street-like network: a jittered size x size grid of junctions with a fifth of the
+    blocks merged, a fifth of the streets one-way and a 'length' on every edge.
+    """
+    rng = np.random.default_rng(seed)
+    grid = nx.grid_2d_graph(size, size)
+    grid.remove_edges_from([e for e in grid.edges if rng.random() < 0.2])
+    graph = nx.DiGraph()
+    for (x, y) in grid:
+        graph.add_node((x, y), pos=(x + rng.uniform(-0.3, 0.3), y + rng.uniform(-0.3, 0.3)))
+    for u, v in grid.edges:
+        length = 100 * float(np.hypot(*np.subtract(graph.nodes[u]['pos'], graph.nodes[v]['pos'])))
+        graph.add_edge(u, v, length=length)
+        if rng.random() >= 0.2:
+            graph.add_edge(v, u, length=length)
+    return graph
@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import os
+
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.empowerment import graph_node_empowerment, graph_node_empowerment_horizons
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def _canonical_order(compiled: CompiledGraph) -> Tuple[list, np.ndarray]:
+    """Node reprs in canonical (sorted) order and the compiled node index of each canonical position"""
+    reprs = [repr(node) for node in compiled.nodes]
+    order = np.array(sorted(range(len(reprs)), key=reprs.__getitem__), dtype=np.int64)
+    return [reprs[i] for i in order], order
+
+
+def _fingerprint(compiled: CompiledGraph) -> Tuple[str, np.ndarray]:
+    reprs, order = _canonical_order(compiled)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    digest = hashlib.sha256()
+    for r in reprs:
+        digest.update(r.encode())
+        digest.update(b'\0')
+
+    src = rank[np.repeat(np.arange(compiled.number_of_nodes()), compiled.degree())]
+    dst = rank[compiled.indices]
+    if compiled.action is not None:
+        labels = [str(a) for a in compiled.actions]
+        label_rank = np.empty(len(labels) + 1, dtype=np.int64)
+        label_rank[:-1] = np.argsort(np.argsort(labels, kind='stable'), kind='stable')
+        # Unlabelled edges (-1) index the last entry
+        label_rank[-1] = -1
+        action = label_rank[compiled.action]
+        digest.update('\0'.join(sorted(labels)).encode())
+    else:
+        action = np.full(len(dst), -1, dtype=np.int64)
+    edges = np.stack([src, dst, action])
+    edges = edges[:, np.lexsort(edges[::-1])]
+    digest.update(b'edges')
+    digest.update(np.ascontiguousarray(edges).tobytes())
+    return digest.hexdigest()[:32], order
+
+
+def graph_fingerprint(graph: Union[nx.Graph, CompiledGraph]) -> str:
+    """
+    Fingerprint of the structure of a graph: its nodes, edges and edge action labels.
+
+    The fingerprint does not depend on the order in which nodes and edges were added.
+    """
+    return _fingerprint(as_compiled(graph))[0]
+
+
+class EmpowermentCache:
+    """
+    On disk cache of empowerment results keyed by graph fingerprint and horizon.
+
+    Each entry is a compressed .npz file holding the horizons it covers and a node x horizon array of
+    empowerment in canonical node order. A cached run of horizons 1..K also serves any lower horizon.
+    When the total size exceeds max_bytes the least recently used entries are deleted.
+
+    :param directory: where to keep the cache, defaults to $NXEMPOWERMENT_CACHE_DIR or ~/.cache/nxempowerment
+    :param max_bytes: size limit of the cache directory
+    """
+
+    def __init__(self, directory: Union[str, Path] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if directory is None:
+            directory = os.getenv('NXEMPOWERMENT_CACHE_DIR', Path.home() / '.cache' / 'nxempowerment')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _entries(self, fingerprint: str):
+        return self.directory.glob('{}-*.npz'.format(fingerprint))
+
+    def get(self, fingerprint: str, horizons: Sequence[int]) -> Optional[np.ndarray]:
+        """
+        :return: node x horizon array in canonical node order for the requested horizons, or None
+        """
+        for path in self._entries(fingerprint):
+            try:
+                with np.load(path) as entry:
+                    cached = list(entry['horizons'])
+                    if not all(h in cached for h in horizons):
+                        continue
+                    values = entry['values'][:, [cached.index(h) for h in horizons]]
+            except (OSError, KeyError, ValueError):
+                # Evicted by another process or partially written
+                continue
+            # Mark as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                # Evicted by another process since it was read, the values are still valid
+                pass
+            logger.info("Empowerment cache hit for %s horizons %s", fingerprint, list(horizons))
+            return values
+        return None
+
+    def put(self, fingerprint: str, horizons: Sequence[int], values: np.ndarray) -> Path:
+        path = self.directory / '{}-{}-{}-{}.npz'.format(fingerprint, min(horizons), max(horizons), len(horizons))
+        # Write to a temporary file first so readers never see a partial entry
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, horizons=np.asarray(horizons), values=values)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+        return path
+
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob('*.npz'))
+
+    def evict(self, keep: Optional[Path] = None):
+        """
+        Delete the least recently used entries until the cache fits in max_bytes.
+
+        :param keep: an entry that is never deleted, e.g. the one just written
+        """
+        entries = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            logger.info("Evicting %s from the empowerment cache", path.name)
+            path.unlink(missing_ok=True)
+            total -= size
+        if keep is not None and total > self.max_bytes:
+            logger.warning("The empowerment cache entry %s is larger than max_bytes %s", keep.name, self.max_bytes)
+
+    def clear(self):
+        for path in self.directory.glob('*.npz'):
+            path.unlink(missing_ok=True)
+
+
+def _check_method(kwargs):
+    if kwargs.get('method', 'frontier') not in ('frontier', 'bitset'):
+        raise ValueError("Only exact empowerment methods can be cached")
+    if kwargs.get('symmetry'):
+        raise ValueError("Symmetry memoized empowerment cannot be cached")
+
+
+def cached_graph_node_empowerment(graph: Union[nx.Graph, CompiledGraph], num_steps: int,
+                                  cache: EmpowermentCache = None, **kwargs) -> dict:
+    """
+    graph_node_empowerment() backed by an EmpowermentCache.
+
+    :param cache: the cache to use, defaults to EmpowermentCache()
+    :param kwargs: passed to graph_node_empowerment() on a cache miss
+    """
+    _check_method(kwargs)
+    cache = cache or EmpowermentCache()
+    compiled = as_compiled(graph)
+    num_steps = max(num_steps, 1)
+    fingerprint, order = _fingerprint(compiled)
+    values = cache.get(fingerprint, [num_steps])
+    if values is not None:
+        empowerment = np.empty(len(order))
+        empowerment[order] = values[:, 0]
+        return dict(zip(compiled.nodes, empowerment.tolist()))
+
+    empowerment = graph_node_empowerment(compiled, num_steps, **kwargs)
+    values = np.array([empowerment[compiled.nodes[i]] for i in order])
+    cache.put(fingerprint, [num_steps], values[:, np.newaxis])
+    return empowerment
+
+
+def cached_graph_node_empowerment_horizons(graph: Union[nx.Graph, CompiledGraph], max_steps: int,
+                                           cache: EmpowermentCache = None,
+                                           **kwargs) -> Tuple[np.ndarray, Dict[Hashable, int]]:
+    """
+    graph_node_empowerment_horizons() backed by an EmpowermentCache.
+
+    :param cache: the cache to use, defaults to EmpowermentCache()
+    :param kwargs: passed to graph_node_empowerment_horizons() on a cache miss
+    """
+    _check_method(kwargs)
+    if kwargs.get('set_attributes'):
+        raise ValueError("set_attributes is not supported with the cache")
+    cache = cache or EmpowermentCache()
+    compiled = as_compiled(graph)
+    horizons = list(range(1, max_steps + 1))
+    fingerprint, order = _fingerprint(compiled)
+    values = cache.get(fingerprint, horizons)
+    if values is not None:
+        empowerment = np.empty_like(values)
+        empowerment[order] = values
+        return empowerment, compiled.index
+
+    empowerment, index = graph_node_empowerment_horizons(compiled, max_steps, **kwargs)
+    cache.put(fingerprint, horizons, empowerment[order])
+    return empowerment, index
@@ -0,0 +1,256 @@
+import logging
+import math
+
+from typing import Hashable, List, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import DEFAULT_MAX_MEMORY
+
+
+logger = logging.getLogger(__name__)
+
+
+def next_state_table(graph: Union[nx.Graph, CompiledGraph]) -> Tuple[np.ndarray, List[Hashable]]:
+    """
+    The deterministic transition function of the graph as a (num_nodes, num_actions) table of next node indices.
+
+    The actions are graph.graph['actions'] together with any edge action labels, see
+    CompiledGraph.action_table. An action without an edge from a node leaves the agent where it is.
+
+    :return: the table and the list of actions indexing its columns
+    """
+    compiled = as_compiled(graph)
+    table = compiled.action_table.astype(np.int64)
+    missing = table < 0
+    table[missing] = np.nonzero(missing)[0]
+    return table, list(compiled.actions)
+
+
+def slip_table(graph: nx.Graph, compiled: CompiledGraph, slip: float = 0.0,
+               slip_attribute: str = 'slip') -> np.ndarray:
+    """
+    The slip probability of every node and action as a (num_nodes, num_actions) array.
+
+    An edge with the slip_attribute sets the slip of its action from its source node, every other node
+    and action, including actions without an edge, slips with probability slip.
+
+    :param graph: the networkx graph holding the edge attributes
+    :param compiled: graph compiled with compile_graph(), fixing the node and action order
+    :param slip: slip probability of edges without the attribute
+    :param slip_attribute: name of the edge attribute holding the slip probability
+    :return:
+    """
+    slips = np.full((compiled.number_of_nodes(), len(compiled.actions)), float(slip))
+    index = compiled.index
+    action_index = {a: i for i, a in enumerate(compiled.actions)}
+    for u, v, d in graph.edges(data=True):
+        if slip_attribute in d:
+            slips[index[u], action_index[d['action']]] = d[slip_attribute]
+            if not graph.is_directed():
+                slips[index[v], action_index[d['action']]] = d[slip_attribute]
+    if ((slips < 0) | (slips > 1)).any():
+        raise ValueError("Slip probabilities must lie between 0 and 1")
+    return slips
+
+
+def transition_tensor(table: np.ndarray, slips: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sparse node x action -> next node transition probabilities with slips.
+
+    With probability 1 - slips[node, action] the chosen action is carried out, otherwise an action chosen
+    uniformly at random is carried out instead.
+
+    :param table: next state table, see next_state_table()
+    :param slips: slip probability of every node and action, see slip_table()
+    :return: COO arrays of node, action, next node and probability, duplicates summed
+    """
+    num_nodes, num_actions = table.shape
+    node = np.repeat(np.arange(num_nodes), num_actions * num_actions)
+    action = np.tile(np.repeat(np.arange(num_actions), num_actions), num_nodes)
+    executed = np.tile(np.arange(num_actions), num_nodes * num_actions)
+    slip = slips[node, action]
+    prob = slip / num_actions + (1 - slip) * (action == executed)
+    next_node = table[node, executed]
+    keys = (node * num_actions + action) * num_nodes + next_node
+    keys, inverse = np.unique(keys, return_inverse=True)
+    prob = np.bincount(inverse.reshape(-1), weights=prob)
+    keep = prob > 0
+    keys, prob = keys[keep], prob[keep]
+    return keys // (num_actions * num_nodes), keys // num_nodes % num_actions, keys % num_nodes, prob
+
+
+def _scatter(dist: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """out[x, targets[s]] += dist[x, s] for every row x"""
+    rows, width = dist.shape
+    flat = (np.arange(rows)[:, np.newaxis] * width + targets[np.newaxis, :]).ravel()
+    return np.bincount(flat, weights=dist.ravel(), minlength=rows * width).reshape(rows, width)
+
+
+def _scatter_weighted(dist: np.ndarray, sources: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """out[x, targets[e]] += dist[x, sources[e]] * weights[e] for every row x and entry e"""
+    rows, width = dist.shape
+    flat = (np.arange(rows)[:, np.newaxis] * width + targets[np.newaxis, :]).ravel()
+    return np.bincount(flat, weights=(dist[:, sources] * weights).ravel(), minlength=rows * width).reshape(rows, width)
+
+
+def _local_states(table: np.ndarray, sources: np.ndarray, num_steps: int) -> np.ndarray:
+    """The sorted node indices a batch of start nodes can reach in num_steps steps"""
+    local = np.unique(sources)
+    for _ in range(num_steps):
+        local = np.union1d(local, table[local].ravel())
+    return local
+
+
+def _channel_bytes(num_sources: int, num_local: int, num_actions: int, num_steps: int) -> int:
+    """Approximate peak memory of composing the channels of a batch, about four channel sized arrays"""
+    return 4 * 8 * num_sources * num_actions ** num_steps * (num_local + 1)
+
+
+def _sequence_channels(table: np.ndarray, sources: np.ndarray, local: np.ndarray, num_steps: int,
+                       slip: Union[float, np.ndarray]) -> np.ndarray:
+    """
+    The n-step action sequence channels of a batch of start nodes over the states they can reach.
+
+    :param local: the states the batch can reach, see _local_states()
+    :param slip: slip probability of every transition, or of every node and action, see slip_table()
+    :return: array of shape (batch, num_actions ** num_steps, local states) where [b, s] is the
+             distribution of the end state of action sequence s from sources[b]
+    """
+    num_actions = table.shape[1]
+    # Local transition table, the last state is an absorbing sink for transitions leaving the local
+    # states, they are only taken from states at the horizon and never carry probability
+    local_table = np.searchsorted(local, table[local])
+    outside = (local_table >= len(local)) | (local[np.minimum(local_table, len(local) - 1)] != table[local])
+    local_table[outside] = len(local)
+    local_table = np.vstack([local_table, np.full(num_actions, len(local))])
+
+    width = len(local) + 1
+    dist = np.zeros((len(sources), 1, width))
+    dist[np.arange(len(sources)), 0, np.searchsorted(local, sources)] = 1
+    if np.ndim(slip):
+        # Slips differ between nodes and actions, compose from the sparse transition tensor
+        local_slips = np.vstack([slip[local], np.zeros(num_actions)])
+        entries = transition_tensor(local_table, local_slips)
+        by_action = [tuple(e[entries[1] == a] for e in (entries[0], entries[2], entries[3]))
+                     for a in range(num_actions)]
+    for _ in range(num_steps):
+        batch, sequences, _ = dist.shape
+        flat = dist.reshape(batch * sequences, width)
+        if np.ndim(slip):
+            moved = np.stack([_scatter_weighted(flat, *by_action[a]) for a in range(num_actions)], axis=1)
+        else:
+            moved = np.stack([_scatter(flat, local_table[:, a]) for a in range(num_actions)], axis=1)
+            if slip:
+                moved = (1 - slip) * moved + slip * moved.mean(axis=1, keepdims=True)
+        dist = moved.reshape(batch, sequences * num_actions, width)
+    return dist
+
+
+def _compact_outputs(channels: np.ndarray) -> np.ndarray:
+    """Move the outputs each channel can produce to the front and drop the outputs no channel produces"""
+    support = (channels > 0).any(axis=1)
+    width = int(support.sum(axis=1).max(initial=0))
+    order = np.argsort(~support, axis=1, kind='stable')[:, np.newaxis, :width]
+    return np.take_along_axis(channels, order, axis=2)
+
+
+def blahut_arimoto(channels: np.ndarray, tol: float = 1e-6, max_iter: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Channel capacity of a batch of channels with the Blahut-Arimoto algorithm.
+
+    Every channel of the batch is iterated together, channels drop out of the update once the gap between
+    the upper and lower bound of their capacity is below tol.
+
+    :param channels: array of shape (batch, inputs, outputs) of conditional output distributions
+    :param tol: convergence tolerance in bits
+    :param max_iter: iteration cap
+    :return: capacities in bits and whether each channel converged
+    """
+    batch, inputs, _ = channels.shape
+    channels = _compact_outputs(channels)
+    log_channels = np.zeros_like(channels)
+    np.log(channels, out=log_channels, where=channels > 0)
+    p = np.full((batch, inputs), 1 / inputs)
+    capacity = np.zeros(batch)
+    active = np.arange(batch)
+    tol_nats = tol * math.log(2)
+    for _ in range(max_iter):
+        q = np.einsum('bi,bio->bo', p[active], channels[active])
+        log_q = np.zeros_like(q)
+        np.log(q, out=log_q, where=q > 0)
+        # Relative entropy of each input's output distribution from the output marginal
+        divergence = np.einsum('bio,bio->bi', channels[active], log_channels[active] - log_q[:, np.newaxis, :])
+        weights = p[active] * np.exp(divergence)
+        lower = np.log(weights.sum(axis=1))
+        upper = divergence.max(axis=1)
+        capacity[active] = lower
+        p[active] = weights / weights.sum(axis=1, keepdims=True)
+        done = upper - lower < tol_nats
+        active = active[~done]
+        if len(active) == 0:
+            break
+    converged = np.ones(batch, dtype=bool)
+    converged[active] = False
+    return np.maximum(capacity, 0) / math.log(2), converged
+
+
+def graph_channel_empowerment(graph: Union[nx.Graph, CompiledGraph], num_steps: int, slip: float = 0.0,
+                              slip_attribute: str = 'slip', tol: float = 1e-6, max_iter: int = 1000, batch_size: int = 256,
+                              max_memory: int = DEFAULT_MAX_MEMORY) -> dict:
+    """
+    Channel capacity empowerment of every node over n-step action sequences with noisy transitions.
+
+    The transition function comes from the edge action labels, see next_state_table(). With probability
+    1 - slip the chosen action is carried out, otherwise an action chosen uniformly at random is carried
+    out instead. Edges of a networkx graph with the slip_attribute set their own slip probability,
+    see slip_table(), a CompiledGraph keeps no edge attributes so every transition slips with slip.
+    For each batch of start nodes the n-step action sequence channels are composed over the
+    states the batch can reach and their capacities are found with batched Blahut-Arimoto.
+
+    Unlike graph_node_empowerment() the start node counts as an outcome, staying put is a choice.
+    With slip=0 the empowerment is log2 of the number of nodes reachable in exactly num_steps steps,
+    where actions without an edge leave the agent in place.
+
+    :param graph: a networkx graph or a CompiledGraph with labelled edges
+    :param num_steps: the empowerment horizon
+    :param slip: probability that a random action is carried out instead of the chosen one, for edges
+                 without the slip_attribute
+    :param slip_attribute: name of the edge attribute holding the slip probability of the edge's action
+    :param tol: Blahut-Arimoto convergence tolerance in bits
+    :param max_iter: Blahut-Arimoto iteration cap
+    :param batch_size: number of start nodes computed together
+    :param max_memory: approximate memory budget in bytes for the channels of one batch, batches are
+                       split before composing until they fit or hold a single node
+    :return: dict of node: empowerment in bits
+    """
+    compiled = as_compiled(graph)
+    table, actions = next_state_table(compiled)
+    if not isinstance(graph, CompiledGraph):
+        slips = slip_table(graph, compiled, slip, slip_attribute)
+        if (slips != slip).any():
+            slip = slips
+    num_steps = max(num_steps, 1)
+    num_nodes = compiled.number_of_nodes()
+    logger.info("Computing channel Empowerment for %s nodes, %s actions and %s steps with slip %s",
+                num_nodes, len(actions), num_steps, 'per edge' if np.ndim(slip) else slip)
+
+    empowerment = np.zeros(num_nodes)
+    not_converged = 0
+    batches = [np.arange(start, min(start + batch_size, num_nodes)) for start in range(0, num_nodes, batch_size)]
+    while batches:
+        sources = batches.pop()
+        local = _local_states(table, sources, num_steps)
+        if _channel_bytes(len(sources), len(local), len(actions), num_steps) > max_memory and len(sources) > 1:
+            half = len(sources) // 2
+            batches += [sources[:half], sources[half:]]
+            continue
+        channels = _sequence_channels(table, sources, local, num_steps, slip)
+        capacity, converged = blahut_arimoto(channels, tol, max_iter)
+        empowerment[sources] = capacity
+        not_converged += int((~converged).sum())
+    if not_converged:
+        logger.warning("Blahut-Arimoto did not converge within %s iterations for %s nodes", max_iter, not_converged)
+    return dict(zip(compiled.nodes, empowerment.tolist()))
@@ -0,0 +1,253 @@
+import logging
+
+from functools import cached_property
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Frontier size above which a breadth first search switches from Python sets to NumPy gathers
+VECTORIZE_FRONTIER = 64
+# The implicit action that leaves the agent where it is
+STAY_ACTION = 'o'
+
+
+class CompiledGraph:
+    """
+    A read only compressed sparse row (CSR) representation of a directed graph.
+
+    Nodes are numbered 0..N-1 in the iteration order of the source graph. The successors of
+    node i are indices[indptr[i]:indptr[i + 1]]. Optional per-edge arrays are aligned with indices:
+    action holds an index into actions (-1 for an unlabelled edge) and distance holds the edge length.
+
+    Compile a graph once with compile_graph() and pass the result to the empowerment functions
+    in place of the networkx graph to run many horizons and queries against it.
+    """
+
+    def __init__(self,
+                 nodes: Sequence[Hashable],
+                 indptr: np.ndarray,
+                 indices: np.ndarray,
+                 action: Optional[np.ndarray] = None,
+                 actions: Optional[List[Hashable]] = None,
+                 distance: Optional[np.ndarray] = None):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self.action = action
+        self.actions = actions
+        self.distance = distance
+        # Search workspace: marks[i] == query id when node i has been reached by the current query
+        self._marks = None
+        self._query = 0
+
+    @cached_property
+    def index(self) -> Dict[Hashable, int]:
+        """Dict of node: node index"""
+        return {node: i for i, node in enumerate(self.nodes)}
+
+    @cached_property
+    def action_table(self) -> np.ndarray:
+        """
+        The transition function as a (num_nodes, num_actions) int32 table of the node index each action
+        leads to, -1 where a node has no edge with that action. Columns follow actions. The 'o' action
+        leads back to the node itself unless the node has an explicit 'o' edge.
+        """
+        if self.action is None:
+            raise ValueError("The graph has no edges labelled with an 'action'")
+        if (self.action < 0).any():
+            raise ValueError("Every edge must be labelled with an 'action'")
+        num_nodes, num_actions = self.number_of_nodes(), len(self.actions)
+        sources = np.repeat(np.arange(num_nodes), self.degree())
+        pairs = sources * num_actions + self.action
+        if len(np.unique(pairs)) != len(pairs):
+            raise ValueError("A node has more than one edge with the same action")
+        table = np.full((num_nodes, num_actions), -1, dtype=np.int32)
+        if STAY_ACTION in self.actions:
+            table[:, self.actions.index(STAY_ACTION)] = np.arange(num_nodes)
+        table[sources, self.action] = self.indices
+        return table
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return len(self.indices)
+
+    def degree(self) -> np.ndarray:
+        """Out degree of every node"""
+        return np.diff(self.indptr)
+
+    def successors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def gather(self, frontier: np.ndarray) -> np.ndarray:
+        """The successors of every node in frontier, concatenated (may contain duplicates)"""
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return self.indices[:0]
+        # Offset of each output position into indices: runs of length lengths[j] starting at starts[j]
+        run_starts = np.cumsum(lengths) - lengths
+        offsets = np.repeat(starts - run_starts, lengths) + np.arange(total)
+        return self.indices[offsets]
+
+    def _levels(self, source: int, max_steps: int) -> Iterator[Tuple[Sequence[int], int, Sequence[int]]]:
+        """
+        Level synchronous breadth first search from node index source, up to max_steps levels.
+
+        Yields for each level the frontier that was expanded, the number of nodes reached so far including
+        the source, and the new frontier. Stops early once the new frontier is empty. Small frontiers are
+        expanded in Python, once the frontier grows past VECTORIZE_FRONTIER nodes each level is expanded
+        with vectorized CSR gathers and the frontiers are arrays.
+        """
+        indptr, indices = self.indptr, self.indices
+        seen = {source}
+        frontier = [source]
+        marks = None
+        for step in range(max_steps):
+            if marks is None and len(frontier) > VECTORIZE_FRONTIER:
+                marks = self._workspace()
+                self._query += 1
+                query = self._query
+                marks[np.fromiter(seen, dtype=np.int64, count=len(seen))] = query
+                frontier = np.array(frontier, dtype=indices.dtype)
+                reached = len(seen)
+            expanded = frontier
+            if marks is None:
+                next_frontier = []
+                for n in frontier:
+                    for m in indices[indptr[n]:indptr[n + 1]].tolist():
+                        if m not in seen:
+                            seen.add(m)
+                            next_frontier.append(m)
+                frontier = next_frontier
+                reached = len(seen)
+            else:
+                nbrs = self.gather(frontier)
+                frontier = np.unique(nbrs[marks[nbrs] != query])
+                marks[frontier] = query
+                reached += len(frontier)
+            yield expanded, reached, frontier
+            if len(frontier) == 0:
+                return
+
+    def frontier_counts(self, source: int, max_steps: int) -> np.ndarray:
+        """
+        Level synchronous breadth first search from node index source, see _levels().
+
+        Returns an array where entry k - 1 is the number of nodes reachable in at most k steps,
+        including the source. Not thread safe, the workspace is shared between queries on the same
+        CompiledGraph.
+        """
+        counts = np.empty(max_steps, dtype=np.int64)
+        step, reached = 0, 1
+        for step, (_, reached, _) in enumerate(self._levels(source, max_steps)):
+            counts[step] = reached
+        # The search stopped early once nothing new was reached
+        counts[step + 1:] = reached
+        return counts
+
+    def frontier_counts_instrumented(self, source: int, max_steps: int) -> Tuple[np.ndarray, int, int, int]:
+        """
+        As frontier_counts() but also counting the work of the search. Kept apart from frontier_counts()
+        so that the counters cost nothing when they are not wanted.
+
+        :return: the counts, the number of nodes expanded, the number of edges traversed and the
+                 largest frontier
+        """
+        counts = np.empty(max_steps, dtype=np.int64)
+        expanded = traversed = 0
+        peak = 1
+        for step, (frontier, reached, next_frontier) in enumerate(self._levels(source, max_steps)):
+            counts[step:] = reached
+            frontier = np.asarray(frontier, dtype=np.int64)
+            expanded += len(frontier)
+            traversed += int((self.indptr[frontier + 1] - self.indptr[frontier]).sum())
+            peak = max(peak, len(next_frontier))
+        return counts, expanded, traversed, peak
+
+    def _workspace(self) -> np.ndarray:
+        if self._marks is None or self._query >= np.iinfo(self._marks.dtype).max:
+            self._marks = np.zeros(self.number_of_nodes(), dtype=np.int64)
+            self._query = 0
+        return self._marks
+
+    def __getstate__(self):
+        # The search workspace, the index and the action table are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_marks'] = None
+        state['_query'] = 0
+        state.pop('index', None)
+        state.pop('action_table', None)
+        return state
+
+
+def compile_graph(graph: nx.Graph, distance: Optional[str] = 'distance',
+                  default_distance: float = 1.0) -> CompiledGraph:
+    """
+    Compile a networkx graph into a CompiledGraph.
+
+    Undirected graphs are compiled with an edge in each direction and parallel edges of
+    multigraphs are kept, which does not change reachability.
+
+    :param graph: any networkx graph
+    :param distance: name of the edge attribute holding the edge length e.g. 'length' for OSMnx
+                     street networks. If no edge has the attribute no distance array is stored.
+    :param default_distance: length of edges without the distance attribute
+    :return:
+    """
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    dtype = np.int32 if len(nodes) < np.iinfo(np.int32).max else np.int64
+
+    if 'actions' in graph.graph:
+        actions = sorted(graph.graph['actions'], key=str)
+    else:
+        actions = []
+    action_index = {a: i for i, a in enumerate(actions)}
+
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indices = []
+    action = []
+    dist = []
+    has_action = False
+    has_distance = False
+    for i, (node, nbrs) in enumerate(graph.adjacency()):
+        for nbr, data in nbrs.items():
+            edges = data.values() if graph.is_multigraph() else [data]
+            for d in edges:
+                indices.append(index[nbr])
+                a = d.get('action')
+                if a is not None:
+                    has_action = True
+                    if a not in action_index:
+                        action_index[a] = len(actions)
+                        actions.append(a)
+                    action.append(action_index[a])
+                else:
+                    action.append(-1)
+                if distance is not None and distance in d:
+                    has_distance = True
+                    dist.append(d[distance])
+                else:
+                    dist.append(default_distance)
+        indptr[i + 1] = len(indices)
+
+    logger.debug("Compiled a graph of %s nodes and %s edges", len(nodes), len(indices))
+    return CompiledGraph(nodes=nodes,
+                         indptr=indptr,
+                         indices=np.array(indices, dtype=dtype),
+                         action=np.array(action, dtype=np.int32) if has_action else None,
+                         actions=actions or None,
+                         distance=np.array(dist, dtype=np.float64) if has_distance else None)
+
+
+def as_compiled(graph: Union[nx.Graph, CompiledGraph]) -> CompiledGraph:
+    if isinstance(graph, CompiledGraph):
+        return graph
+    return compile_graph(graph)
@@ -0,0 +1,116 @@
+import heapq
+import logging
+
+from typing import Dict, Hashable, Iterable, Sequence, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, compile_graph
+from nxempowerment.utils import count_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+
+def _compiled_with_distance(graph: Union[nx.Graph, CompiledGraph], distance: str) -> CompiledGraph:
+    if isinstance(graph, CompiledGraph):
+        return graph
+    return compile_graph(graph, distance=distance)
+
+
+def _edge_lengths(compiled: CompiledGraph) -> np.ndarray:
+    if compiled.distance is None:
+        return np.ones(compiled.number_of_edges())
+    if (compiled.distance < 0).any():
+        raise ValueError("Edge distances must not be negative")
+    return compiled.distance
+
+
+class _Adjacency:
+    """CSR arrays as Python lists, converted once and shared by every search of a batch"""
+
+    def __init__(self, compiled: CompiledGraph):
+        self.indptr = compiled.indptr.tolist()
+        self.indices = compiled.indices.tolist()
+        self.lengths = _edge_lengths(compiled).tolist()
+
+
+def _bounded_dijkstra(adjacency: _Adjacency, sources: Iterable[int], budget: float) -> Dict[int, float]:
+    """Shortest distance to every node within budget of the nearest source, stops at the budget"""
+    indptr, indices, lengths = adjacency.indptr, adjacency.indices, adjacency.lengths
+    dist = {}
+    heap = [(0.0, s) for s in set(sources)]
+    heapq.heapify(heap)
+    while heap:
+        d, n = heapq.heappop(heap)
+        if n in dist:
+            continue
+        dist[n] = d
+        for e in range(indptr[n], indptr[n + 1]):
+            m = indices[e]
+            nd = d + lengths[e]
+            # Nodes beyond the budget are never pushed, so the heap empties once the budget is spent
+            if nd <= budget and m not in dist:
+                heapq.heappush(heap, (nd, m))
+    return dist
+
+
+def bounded_dijkstra(graph: Union[nx.Graph, CompiledGraph], sources: Sequence[Hashable], budget: float,
+                     distance: str = 'distance') -> Dict[Hashable, float]:
+    """
+    Multi-source Dijkstra over the compiled graph that stops once the distance budget is spent.
+
+    :param graph: a networkx graph or a CompiledGraph. Edges without a distance have length 1.
+    :param sources: start nodes
+    :param budget: the largest distance to search
+    :param distance: edge attribute holding the edge length of a networkx graph, e.g. 'length' for OSMnx
+    :return: dict of node: distance from the nearest source for every node within the budget
+    """
+    compiled = _compiled_with_distance(graph, distance)
+    dist = _bounded_dijkstra(_Adjacency(compiled), [compiled.index[s] for s in sources], budget)
+    return {compiled.nodes[i]: d for i, d in dist.items()}
+
+
+def distance_reachable_counts(graph: Union[nx.Graph, CompiledGraph], budget: float, sources: Sequence[int] = None,
+                              distance: str = 'distance') -> np.ndarray:
+    """
+    Number of nodes within a distance budget of every node, including the node itself.
+
+    :param sources: node indices to compute, by default every node
+    :return: array of counts aligned with sources
+    """
+    compiled = _compiled_with_distance(graph, distance)
+    adjacency = _Adjacency(compiled)
+    if sources is None:
+        sources = range(compiled.number_of_nodes())
+    return np.array([len(_bounded_dijkstra(adjacency, [s], budget)) for s in sources], dtype=np.int64)
+
+
+def node_distance_empowerment(graph: Union[nx.Graph, CompiledGraph], node, budget: float,
+                              distance: str = 'distance') -> float:
+    """Empowerment of a node from the number of nodes within the distance budget of it"""
+    compiled = _compiled_with_distance(graph, distance)
+    return count_empowerment(distance_reachable_counts(compiled, budget, [compiled.index[node]])[0])
+
+
+def graph_node_distance_empowerment(graph: Union[nx.Graph, CompiledGraph], budget: float,
+                                    distance: str = 'distance') -> dict:
+    """
+    Compute distance budgeted empowerment for every node of the graph.
+
+    Counts the nodes reachable within a metric budget, e.g. 400 m of street, rather than within a
+    number of steps, so long and short edges are not treated alike.
+
+    :param graph: a networkx graph or a CompiledGraph compiled with the distance attribute,
+                  e.g. compile_graph(street_graph, distance='length')
+    :param budget: the largest distance to travel
+    :param distance: edge attribute holding the edge length of a networkx graph
+    :return: dict of node: empowerment
+    """
+    logger.info("Computing distance Empowerment within %s for a graph of %s", budget, graph.number_of_nodes())
+    compiled = _compiled_with_distance(graph, distance)
+    if compiled.distance is None:
+        logger.warning("The graph has no edge distances, every edge has length 1")
+    counts = distance_reachable_counts(compiled, budget)
+    return {node: count_empowerment(count) for node, count in zip(compiled.nodes, counts)}
@@ -1,35 +1,213 @@
 import logging
 
-from typing import Tuple
+from contextlib import contextmanager
+from typing import Dict, Hashable, List, Optional, Tuple, Union
 
 import networkx as nx
+import numpy as np
 
-from nxempowerment.utils import logzero
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.instrumentation import EmpowermentStats, Progress, ProgressCallback
+from nxempowerment.parallel import parallel_frontier_counts
+from nxempowerment.reachability import reachable_counts, reachable_counts_horizons
+from nxempowerment.sketch import hyperloglog_counts, hyperloglog_relative_error
+from nxempowerment.symmetry import symmetric_reachable_counts
+from nxempowerment.utils import count_empowerment, counts_empowerment
 
 
 logger = logging.getLogger(__name__)
 
 
-def succ(graph: nx.Graph, node: tuple, seen: set, step: int, max_steps: int) -> None:
-    step += 1
-    for n in nx.neighbors(graph, node):
-        seen.add(n)
-        if step < max_steps:
-            succ(graph, n, seen, step, max_steps)
+def frontier_counts(graph: nx.Graph, node, max_steps: int) -> List[int]:
+    """
+    Level synchronous breadth first search from node.
 
+    Returns a list where entry k - 1 is the number of nodes reachable in at most k steps,
+    including the start node. Each node is expanded at most once, at the first (shortest)
+    depth at which it is reached, so the work is bounded by the size of the reachable set.
+    """
+    seen = {node}
+    frontier = [node]
+    counts = []
+    for _ in range(max_steps):
+        next_frontier = []
+        for n in frontier:
+            for m in graph[n]:
+                if m not in seen:
+                    seen.add(m)
+                    next_frontier.append(m)
+        counts.append(len(seen))
+        if not next_frontier:
+            # Nothing new can be reached, the remaining horizons have the same count
+            counts.extend([len(seen)] * (max_steps - len(counts)))
+            break
+        frontier = next_frontier
+    return counts
 
-def node_empowerment(graph: nx.Graph, node: tuple, num_steps: int) -> float:
-    # Include the start node so it is not visited by the recursion
-    successors = {node}
-    succ(graph, node, successors, 0, num_steps)
+
+def node_empowerment(graph: Union[nx.Graph, CompiledGraph], node, num_steps: int) -> float:
+    # An agent always takes at least one step
+    num_steps = max(num_steps, 1)
+    if isinstance(graph, CompiledGraph):
+        counts = graph.frontier_counts(graph.index[node], num_steps)
+    else:
+        counts = frontier_counts(graph, node, num_steps)
     # Do not include the start node to compute the empowerment
-    return logzero(max(len(successors) - 1, 0))
+    return count_empowerment(counts[-1])
+
 
+def graph_node_empowerment(graph: Union[nx.Graph, CompiledGraph], num_steps: int, method: str = 'frontier',
+                           workers: int = None, symmetry: bool = False, stats: EmpowermentStats = None,
+                           progress: ProgressCallback = None, **kwargs) -> dict:
+    """
+    Compute empowerment for every node of the graph.
 
-def graph_node_empowerment(graph: nx.Graph, num_steps: int) -> dict:
+    :param graph: a networkx graph or a CompiledGraph. A networkx graph is compiled for the duration
+                  of the call, compile it once with compile_graph() to reuse it across calls.
+    :param num_steps: the empowerment horizon
+    :param method: 'frontier' runs a breadth first search from each node in turn.
+                   'bitset' computes the reachable sets of all nodes together as packed bitsets, see
+                   reachability.reachable_counts(), which is much faster for longer horizons on graphs
+                   of up to a few hundred thousand nodes.
+                   'hyperloglog' approximates the reachable counts with HyperLogLog sketches, see
+                   sketch.hyperloglog_counts(), for huge graphs and long horizons. The relative standard
+                   error of the counts, set by the register_bits keyword, is logged.
+    :param workers: run the 'frontier' searches in a pool of this many processes
+    :param symmetry: run one 'frontier' search per class of structurally identical neighbourhoods,
+                     see symmetry.symmetric_reachable_counts(). The cache hit rate is logged. Classes
+                     are checked by sampling, pass verify=False to skip the check.
+    :param stats: an EmpowermentStats to fill in with the time of each phase and, for the serial
+                  'frontier' method, the work of the search from each node
+    :param progress: called as progress(done, total, eta_seconds) about once a second during the serial
+                     'frontier' search, e.g. instrumentation.log_progress
+    :param kwargs: passed to the engine selected by method, a TypeError is raised for 'frontier' which
+                   takes none
+    :return: dict of node: empowerment
+    """
     logger.info("Computing Empowerment for a graph of %s", graph.number_of_nodes())
-    empowerment = {}
-    for node in nx.nodes(graph):
-        empowerment[node] = node_empowerment(graph, node, num_steps)
+    phase = stats.phase if stats is not None else _no_phase
+    with phase('compile'):
+        compiled = as_compiled(graph)
+    num_steps = max(num_steps, 1)
+    _check_workers(method, workers)
+    if symmetry and (method != 'frontier' or workers):
+        raise ValueError("symmetry is only supported by the serial 'frontier' method")
+    if method == 'frontier' and not symmetry:
+        _check_no_kwargs(method, kwargs)
+    instrumented = method == 'frontier' and not workers and not symmetry and (stats is not None or progress)
+    if progress and not instrumented:
+        raise ValueError("progress is only supported by the serial 'frontier' method")
+    with phase('search'):
+        if instrumented:
+            counts = _instrumented_counts(compiled, num_steps, stats, progress)
+        else:
+            counts = _counts(compiled, num_steps, method, workers, symmetry, **kwargs)
+    with phase('write_back'):
+        empowerment = {}
+        for node, count in zip(compiled.nodes, counts):
+            empowerment[node] = count_empowerment(count)
+    if stats is not None:
+        stats.log(logging.DEBUG)
     logger.info("Finished Computing Empowerment for a graph of %s", graph.number_of_nodes())
     return empowerment
+
+
+def _counts(compiled: CompiledGraph, num_steps: int, method: str, workers: int, symmetry: bool, **kwargs):
+    """Reachable counts of every node from the engine selected by method"""
+    if symmetry:
+        counts, _ = symmetric_reachable_counts(compiled, num_steps, **kwargs)
+    elif method == 'frontier' and workers:
+        counts = parallel_frontier_counts(compiled, num_steps, workers)[:, -1]
+    elif method == 'frontier':
+        counts = (compiled.frontier_counts(i, num_steps)[-1] for i in range(compiled.number_of_nodes()))
+    elif method == 'bitset':
+        counts = reachable_counts(compiled, num_steps, **kwargs)
+    elif method == 'hyperloglog':
+        # The true counts are integers
+        counts = np.rint(hyperloglog_counts(compiled, num_steps, **kwargs))
+        logger.info("Approximate reachable counts have a relative standard error of %.2f%%",
+                    100 * hyperloglog_relative_error(kwargs.get('register_bits', 8)))
+    else:
+        raise ValueError("Unknown empowerment method {}".format(method))
+    return counts
+
+
+def _instrumented_counts(compiled: CompiledGraph, num_steps: int, stats: Optional[EmpowermentStats],
+                         progress: Optional[ProgressCallback]) -> np.ndarray:
+    num_nodes = compiled.number_of_nodes()
+    stats = stats if stats is not None else EmpowermentStats()
+    stats.allocate(num_nodes)
+    tracker = Progress(progress, num_nodes) if progress else None
+    counts = np.empty(num_nodes, dtype=np.int64)
+    for i in range(num_nodes):
+        node_counts, stats.nodes_expanded[i], stats.edges_traversed[i], stats.peak_frontier[i] = \
+            compiled.frontier_counts_instrumented(i, num_steps)
+        counts[i] = node_counts[-1]
+        if tracker:
+            tracker.update(i + 1)
+    return counts
+
+
+@contextmanager
+def _no_phase(name: str):
+    yield
+
+
+def graph_node_empowerment_horizons(graph: Union[nx.Graph, CompiledGraph], max_steps: int, method: str = 'frontier',
+                                    set_attributes: bool = False, workers: int = None,
+                                    **kwargs) -> Tuple[np.ndarray, Dict[Hashable, int]]:
+    """
+    Compute empowerment for every node of the graph and every horizon 1..max_steps in one pass.
+
+    Each search records the number of nodes reached at every depth, so horizon k is read off the
+    frontier of horizon k - 1 rather than searching again.
+
+    :param graph: a networkx graph or a CompiledGraph
+    :param max_steps: the largest empowerment horizon
+    :param method: 'frontier' or 'bitset', see graph_node_empowerment()
+    :param set_attributes: also set the node attribute '{k}_step_empowerment' for every horizon k
+                           on the networkx graph
+    :param workers: run the 'frontier' searches in a pool of this many processes
+    :param kwargs: passed to the engine selected by method
+    :return: array of shape (number of nodes, max_steps) where column k - 1 is the k step empowerment,
+             and a dict of node: row index
+    """
+    if set_attributes and isinstance(graph, CompiledGraph):
+        raise ValueError("set_attributes requires a networkx graph")
+    logger.info("Computing Empowerment for horizons 1 to %s for a graph of %s", max_steps, graph.number_of_nodes())
+    compiled = as_compiled(graph)
+    _check_workers(method, workers)
+    if method == 'frontier':
+        _check_no_kwargs(method, kwargs)
+    if method == 'frontier' and workers:
+        counts = parallel_frontier_counts(compiled, max_steps, workers)
+    elif method == 'frontier':
+        counts = np.empty((compiled.number_of_nodes(), max_steps), dtype=np.int64)
+        for i in range(compiled.number_of_nodes()):
+            counts[i] = compiled.frontier_counts(i, max_steps)
+    elif method == 'bitset':
+        counts = reachable_counts_horizons(compiled, max_steps, **kwargs)
+    else:
+        raise ValueError("Unknown empowerment method {}".format(method))
+
+    # The same values as graph_node_empowerment(), bit for bit
+    empowerment = counts_empowerment(counts)
+
+    if set_attributes:
+        for k in range(max_steps):
+            nx.set_node_attributes(graph, dict(zip(compiled.nodes, empowerment[:, k].tolist())),
+                                   '{}_step_empowerment'.format(k + 1))
+    logger.info("Finished Computing Empowerment for horizons 1 to %s for a graph of %s",
+                max_steps, graph.number_of_nodes())
+    return empowerment, compiled.index
+
+
+def _check_workers(method: str, workers: int):
+    if workers and method != 'frontier':
+        raise ValueError("workers is only supported by the 'frontier' method")
+
+
+def _check_no_kwargs(method: str, kwargs: dict):
+    # Engines without options would otherwise silently ignore a misspelt keyword
+    if kwargs:
+        raise TypeError("The '{}' method takes no keyword arguments, got {}".format(method, ', '.join(sorted(kwargs))))
@@ -0,0 +1,150 @@
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Hashable, List, Mapping, Sequence, Union
+
+import networkx as nx
+import numpy as np
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+from nxempowerment.empowerment import graph_node_empowerment_horizons
+from nxempowerment.utils import sigfigs
+from nxempowerment.visualize import MAX_LABELS, _colorbar, _edge_endpoints, _node_positions
+
+
+logger = logging.getLogger(__name__)
+
+# The Scene of a worker process, set once by _init_worker()
+_worker_scene = None
+
+
+class Scene:
+    """
+    Everything about a plot of a graph that does not depend on the measure: node positions, node names
+    and edge segments, computed once and shared by every figure of a batch.
+
+    :param graph: a networkx graph whose nodes have a 'pos' attribute
+    :param figsize: figure size, defaults to graph.graph['figsize'] or (15, 10)
+    """
+
+    def __init__(self, graph: nx.Graph, figsize=None):
+        pos = nx.get_node_attributes(graph, 'pos')
+        self.nodes = list(graph.nodes)
+        self.xy, index = _node_positions(graph, pos)
+        src, tgt = _edge_endpoints(graph, index)
+        # Each pair of opposite edges is drawn once and self loops are left out
+        pairs = np.unique(np.sort(np.stack([src, tgt], axis=1), axis=1), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        self.segments = np.stack([self.xy[pairs[:, 0]], self.xy[pairs[:, 1]]], axis=1)
+        self.names = [str(node) for node in self.nodes]
+        self.figsize = figsize or graph.graph.get('figsize', (15, 10))
+
+
+def _labels(scene: Scene, values: np.ndarray, num_sigfigs: int, node_names: bool) -> List[str]:
+    measure_str = [sigfigs(v, num_sigfigs) for v in values.tolist()]
+    if node_names:
+        return ['{}\n{}'.format(name, m) for name, m in zip(scene.names, measure_str)]
+    return measure_str
+
+
+def _render(scene: Scene, values: np.ndarray, labels: List[str], title: str, filepath: Path, format: str,
+            vmin: float, vmax: float, node_size: float, colorbar, rasterized: bool) -> Path:
+    cmap = plt.cm.coolwarm
+    fig = plt.figure(figsize=scene.figsize)
+    ax = fig.gca()
+    ax.add_collection(LineCollection(scene.segments, colors='#000000', linewidths=1, rasterized=rasterized))
+    ax.scatter(scene.xy[:, 0], scene.xy[:, 1], s=node_size, c=values, cmap=cmap, vmin=vmin, vmax=vmax,
+               zorder=2, rasterized=rasterized)
+    if labels is not None:
+        for (x, y), label in zip(scene.xy.tolist(), labels):
+            ax.text(x, y, label, fontsize=10, ha='center', va='center', zorder=3)
+    ax.autoscale_view()
+    ax.set_axis_off()
+    ax.set_title(title)
+    if colorbar:
+        _colorbar(colorbar, cmap, vmin, vmax)
+    fig.savefig(filepath, format=format)
+    plt.close(fig)
+    return filepath
+
+
+def _init_worker(scene: Scene):
+    global _worker_scene
+    plt.switch_backend('Agg')
+    _worker_scene = scene
+
+
+def _render_in_worker(*args) -> Path:
+    return _render(_worker_scene, *args)
+
+
+def plot_graph_measures(graph: nx.Graph, measures: Union[Sequence[str], Mapping[str, Dict[Hashable, float]]],
+                        output_dir: Union[str, Path], format: str = 'png', workers: int = None,
+                        scene: Scene = None, num_sigfigs: int = 3, labels: bool = True, node_names: bool = False,
+                        minval: float = 0.001, shared_scale: bool = False, node_size=1200, colorbar=False,
+                        rasterized: bool = False) -> List[Path]:
+    """
+    Plot a series of measures over the same graph, one figure per measure.
+
+    The layout and edge geometry are computed once, see Scene, and the figures are rendered with the
+    Agg backend in a pool of worker processes, each of which receives the scene only once.
+
+    :param graph: a networkx graph whose nodes have a 'pos' attribute
+    :param measures: names of node attributes, or a dict of figure name: dict of node: value
+    :param output_dir: directory for the figures, named '{name}.{format}'
+    :param format: 'png' or 'pdf'
+    :param workers: number of worker processes, by default render in this process
+    :param scene: a Scene of the graph, build one to reuse it across batches
+    :param labels: write the value of the measure on each node, only for graphs of up to MAX_LABELS nodes
+    :param node_names: also write the node name on each node
+    :param minval: values below minval are shown as 0
+    :param shared_scale: use the same colour scale for every figure, otherwise each figure is scaled
+                         to its own values
+    :return: paths of the figures in the order of measures
+    """
+    scene = scene or Scene(graph)
+    if not isinstance(measures, Mapping):
+        measures = {name: nx.get_node_attributes(graph, name) for name in measures}
+    values = {name: np.array([measure[node] for node in scene.nodes], dtype=np.float64)
+              for name, measure in measures.items()}
+    if minval is not None:
+        for v in values.values():
+            v[v < minval] = 0
+    if labels and len(scene.nodes) > MAX_LABELS:
+        logger.info("Not drawing labels for a graph of more than %s nodes", MAX_LABELS)
+        labels = False
+    if shared_scale:
+        vmin = min(v.min() for v in values.values())
+        vmax = max(v.max() for v in values.values())
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for name, v in values.items():
+        tasks.append((v, _labels(scene, v, num_sigfigs, node_names) if labels else None, name,
+                      output_dir / '{}.{}'.format(name, format), format,
+                      vmin if shared_scale else v.min(), vmax if shared_scale else v.max(),
+                      node_size, colorbar, rasterized))
+    logger.info("Plotting %s figures of a graph of %s nodes to %s", len(tasks), len(scene.nodes), output_dir)
+
+    if not workers:
+        return [_render(scene, *task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scene,)) as executor:
+        return list(executor.map(_render_in_worker, *zip(*tasks)))
+
+
+def plot_empowerment_horizons(graph: nx.Graph, max_steps: int, output_dir: Union[str, Path],
+                              **kwargs) -> List[Path]:
+    """
+    Compute empowerment for horizons 1..max_steps in one pass and plot one figure per horizon,
+    named '{k}_step_empowerment'.
+
+    :param kwargs: passed to plot_graph_measures()
+    """
+    empowerment, index = graph_node_empowerment_horizons(graph, max_steps)
+    measures = {'{}_step_empowerment'.format(k + 1): {node: empowerment[i, k] for node, i in index.items()}
+                for k in range(max_steps)}
+    return plot_graph_measures(graph, measures, output_dir, **kwargs)
@@ -0,0 +1,153 @@
+import logging
+
+from typing import Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import DEFAULT_MAX_MEMORY
+
+
+logger = logging.getLogger(__name__)
+
+
+def _reverse(compiled: CompiledGraph) -> CompiledGraph:
+    """The graph with every edge reversed"""
+    num_nodes = compiled.number_of_nodes()
+    order = np.argsort(compiled.indices, kind='stable')
+    sources = np.repeat(np.arange(num_nodes), compiled.degree())
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(compiled.indices, minlength=num_nodes), out=indptr[1:])
+    return CompiledGraph(nodes=range(num_nodes), indptr=indptr, indices=sources[order])
+
+
+def goal_distances(compiled: CompiledGraph, goals: np.ndarray, reverse: CompiledGraph = None) -> np.ndarray:
+    """
+    Number of steps from every node to each goal, -1 where the goal cannot be reached.
+
+    Value iteration with a cost of one per step for a block of goals at once. Only the (node, goal)
+    pairs whose value changed in the last sweep are backed up, so each sweep is one level of a breadth
+    first search over the predecessors of the goals.
+
+    :param goals: node indices of the goals
+    :param reverse: the reversed graph, see _reverse(), to reuse it across blocks
+    :return: array of shape (number of nodes, number of goals)
+    """
+    reverse = reverse or _reverse(compiled)
+    num_nodes, num_goals = compiled.number_of_nodes(), len(goals)
+    distances = np.full((num_nodes, num_goals), -1, dtype=np.int32)
+    # (node, goal) pairs are kept as flat indices into distances
+    flat = distances.reshape(-1)
+    degree = reverse.degree()
+    frontier = goals.astype(np.int64) * num_goals + np.arange(num_goals)
+    flat[frontier] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        nodes, columns = np.divmod(frontier, num_goals)
+        keys = reverse.gather(nodes).astype(np.int64) * num_goals + np.repeat(columns, degree[nodes])
+        keys = keys[flat[keys] < 0]
+        # Deduplicate without sorting: every new pair claims its entry with its position, the last claim
+        # wins and only the winners move on to the next sweep
+        claims = -2 - np.arange(len(keys), dtype=np.int32)
+        flat[keys] = claims
+        frontier = keys[flat[keys] == claims]
+        flat[frontier] = level
+    return distances
+
+
+def relevant_goal_information(graph: Union[nx.Graph, CompiledGraph],
+                              max_memory: int = DEFAULT_MAX_MEMORY) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Relevant goal information of every node, RGI(s) = H(A|s) - H(A|s,G) in bits.
+
+    When the edges are labelled with an 'action' the actions of a node are the columns of
+    CompiledGraph.action_table, an action without an edge leaving the agent in place as in
+    channel.next_state_table(). Otherwise the actions are the outgoing edges. In both cases the actions
+    that lead back to the node are its stay actions, and a node without any has an implicit stay action.
+    The goals of a node are the nodes it can reach, uniformly distributed, and the policy for each goal
+    is uniform over the actions on a shortest path to it (the stay actions at the goal itself). H(A|s)
+    is the entropy of the action distribution averaged over the goals and H(A|s,G) the average entropy
+    of the goal policies.
+
+    Goals are processed in blocks sized to fit max_memory, see goal_distances().
+
+    :param graph: a networkx graph or a CompiledGraph
+    :param max_memory: approximate memory budget in bytes for one block of goals
+    :return: arrays of relevant goal information and of H(A|s), aligned with the compiled node order
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    reverse = _reverse(compiled)
+    # Every action of every node as a (source, target) pair, grouped by source in CSR order
+    if compiled.action is not None:
+        table = compiled.action_table.astype(np.int64)
+        missing = table < 0
+        table[missing] = np.nonzero(missing)[0]
+        degree = np.full(num_nodes, table.shape[1], dtype=np.int64)
+        targets = table.reshape(-1)
+    else:
+        degree = compiled.degree()
+        targets = compiled.indices.astype(np.int64)
+    num_actions = len(targets)
+    sources = np.repeat(np.arange(num_nodes), degree)
+    loops = sources == targets
+    rows = np.flatnonzero(degree > 0)
+    starts = (np.cumsum(degree) - degree)[rows]
+
+    # Goal counts, the probability mass of each action and the policy entropies summed over goals
+    num_goals = np.zeros(num_nodes, dtype=np.int64)
+    action_mass = np.zeros(num_actions)
+    policy_entropy = np.zeros(num_nodes)
+
+    # The goal s of node s is reached by staying, uniformly over its stay actions or the implicit stay
+    num_loops = np.bincount(sources[loops], minlength=num_nodes)
+    num_stay = np.maximum(num_loops, 1)
+    action_mass[loops] = 1 / num_loops[sources[loops]]
+    stay_mass = (num_loops == 0).astype(np.float64)
+    policy_entropy += np.log2(num_stay)
+
+    # Distances, optimal action masks and their temporaries per goal
+    block = int(max(1, min(num_nodes, max_memory // (32 * num_actions + 32 * num_nodes + 1))))
+    logger.info("Computing relevant goal information for %s nodes in blocks of %s goals", num_nodes, block)
+    for start in range(0, num_nodes, block):
+        goals = np.arange(start, min(start + block, num_nodes))
+        distances = goal_distances(compiled, goals, reverse)
+        num_goals += (distances >= 0).sum(axis=1)
+        source_distance = distances[sources]
+        target_distance = distances[targets]
+        # An action is optimal for a goal when it is on a shortest path, every reachable node other than
+        # the goal has at least one
+        optimal = (source_distance > 0) & (target_distance == source_distance - 1)
+        num_optimal = np.zeros(distances.shape, dtype=np.int64)
+        if len(rows):
+            num_optimal[rows] = np.add.reduceat(optimal, starts, axis=0, dtype=np.int64)
+        moving = distances > 0
+        policy_entropy += np.where(moving, np.log2(np.maximum(num_optimal, 1)), 0).sum(axis=1)
+        share = np.zeros(distances.shape)
+        np.divide(1, num_optimal, out=share, where=num_optimal > 0)
+        action_mass += (optimal * share[sources]).sum(axis=1)
+
+    # Action probabilities p(a|s) averaged over the goals of s
+    action_p = action_mass / num_goals[sources]
+    stay_p = stay_mass / num_goals
+    action_terms = np.zeros(num_actions)
+    np.multiply(action_p, np.log2(action_p, where=action_p > 0, out=np.zeros(num_actions)), out=action_terms)
+    # bincount of no weights is an integer array
+    action_entropy = -np.bincount(sources, weights=action_terms, minlength=num_nodes).astype(np.float64)
+    action_entropy -= np.where(stay_p > 0, stay_p * np.log2(np.where(stay_p > 0, stay_p, 1)), 0)
+    information = action_entropy - policy_entropy / num_goals
+    return np.maximum(information, 0), action_entropy
+
+
+def graph_node_relevant_goal_information(graph: Union[nx.Graph, CompiledGraph],
+                                         max_memory: int = DEFAULT_MAX_MEMORY) -> dict:
+    """
+    Compute relevant goal information for every node of the graph, see relevant_goal_information().
+
+    :return: dict of node: relevant goal information in bits
+    """
+    compiled = as_compiled(graph)
+    information, _ = relevant_goal_information(compiled, max_memory)
+    return dict(zip(compiled.nodes, information.tolist()))
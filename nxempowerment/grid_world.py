@@ -1,22 +1,23 @@
 import math
-from random import randint
 from typing import List
 
 import networkx as nx
+import numpy as np
 
 
 class GridWorldGraph:
-    def __init__(self, randomise_actions: bool = False, euclidean_dist: bool = True):
+    def __init__(self, randomise_actions: bool = False, euclidean_dist: bool = True, seed=None):
         self.randomise_actions = randomise_actions
         self.euclidean_dist = euclidean_dist
+        self.seed = seed
 
     _map = None
 
     def graph(self) -> nx.Graph:
-        return generate_grid_world(self._map, False, self.randomise_actions)
+        return generate_grid_world(self._map, False, self.randomise_actions, seed=self.seed)
 
     def graph_diag(self) -> nx.Graph:
-        return generate_grid_world(self._map, True, self.randomise_actions, self.euclidean_dist)
+        return generate_grid_world(self._map, True, self.randomise_actions, self.euclidean_dist, seed=self.seed)
 
 
 class GridWorldGraph2Rooms(GridWorldGraph):
@@ -50,30 +51,22 @@ class GridWorldGraph2Rooms(GridWorldGraph):
         return graph
 
 
-def _add_node(graph, col_index, row_index, cell, diagonals, randomise_actions=False, euclidean_dist=True):
-    if int(cell) == 1:
-        x = int(col_index)
-        y = int(row_index)
-        node = (x, y)
-        nodes = graph.nodes()
-        graph.add_node(node, pos=node)
-        if (x - 1, y) in nodes:
-            graph.add_edge((x - 1, y), node, action='E')
-            graph.add_edge(node, (x - 1, y), action='W')
-        if (x, y - 1) in nodes:
-            graph.add_edge((x, y - 1), node, action='N')
-            graph.add_edge(node, (x, y - 1), action='S')
-        if diagonals:
-            dist = math.sqrt(2) if euclidean_dist else 1
-            if (x - 1, y - 1) in nodes:
-                graph.add_edge(node, (x - 1, y - 1), action='SW', distance=dist)
-                graph.add_edge((x - 1, y - 1), node, action='NE', distance=dist)
-            if (x + 1, y - 1) in nodes:
-                graph.add_edge(node, (x + 1, y - 1), action='SE', distance=dist)
-                graph.add_edge((x + 1, y - 1), node, action='NW', distance=dist)
-
-
-def generate_grid_world(_map: List[List], diagonals=False, randomise_actions=False, euclidean_dist=True) -> nx.Graph:
+# Neighbour offset (dx, dy) of the cell an action leads to, and the action leading back
+_MOVES = [((1, 0), 'E', 'W'), ((0, 1), 'N', 'S')]
+_DIAGONAL_MOVES = [((1, 1), 'NE', 'SW'), ((-1, 1), 'NW', 'SE')]
+
+
+def _map_array(_map: List[List]) -> np.ndarray:
+    """The map as a boolean array of cells, rows may have different lengths"""
+    width = max((len(row) for row in _map), default=0)
+    cells = np.zeros((len(_map), width), dtype=bool)
+    for row_index, row in enumerate(_map):
+        cells[row_index, :len(row)] = [int(cell) == 1 for cell in row]
+    return cells
+
+
+def generate_grid_world(_map: List[List], diagonals=False, randomise_actions=False, euclidean_dist=True,
+                        seed=None) -> nx.Graph:
     """
     Pass in a gridworld as a list of rows from top to bottom where grid squares with a node are 1 and
     without are 0.
@@ -86,8 +79,12 @@ def generate_grid_world(_map: List[List], diagonals=False, randomise_actions=Fal
     NOTE: for grid worlds to be oriented as expected visually it is easier to define the lists
     making up the grid and call _reverse() - see the examples below
 
+    The node and edge lists are computed with NumPy from the map and added to the graph in bulk.
+
     :param _map: e.g.
     :param diagonals Optional add diagonal edges i.e. NW, NE, SW, SE
+    :param randomise_actions Optional randomly permute the action labels of the edges leaving each node
+    :param seed seed or numpy.random.Generator used to randomise the actions
     :return:
     """
     graph = nx.empty_graph(0, create_using=nx.DiGraph())
@@ -97,19 +94,50 @@ def generate_grid_world(_map: List[List], diagonals=False, randomise_actions=Fal
         actions += ['NE', 'SE', 'SW', 'NW']
     graph.graph['actions'] = set(actions)
 
-    for row_index, row in enumerate(_map):
-        for col_index, cell in enumerate(row):
-            _add_node(graph, col_index, row_index, cell, diagonals, euclidean_dist=euclidean_dist)
-
+    cells = _map_array(_map)
+    height, width = cells.shape
+    ys, xs = np.nonzero(cells)
+    graph.add_nodes_from(((x, y), {'pos': (x, y)}) for x, y in zip(xs.tolist(), ys.tolist()))
+
+    # Edges as arrays of source x, y, target x, y and the index into labels of their move
+    labels = []
+    edges = []
+    moves = _MOVES + _DIAGONAL_MOVES if diagonals else _MOVES
+    for (dx, dy), forward, backward in moves:
+        dist = (math.sqrt(2) if euclidean_dist else 1) if dx and dy else None
+        # Cells at (x, y) with a neighbour at (x + dx, y + dy)
+        x0, x1 = max(0, -dx), width - max(0, dx)
+        both = cells[:height - dy, x0:x1] & cells[dy:, x0 + dx:x1 + dx]
+        sy, sx = np.nonzero(both)
+        sx = sx + x0
+        for label, (src_x, src_y, tgt_x, tgt_y) in [(forward, (sx, sy, sx + dx, sy + dy)),
+                                                     (backward, (sx + dx, sy + dy, sx, sy))]:
+            labels.append((label, dist))
+            edges.append(np.stack([src_x, src_y, tgt_x, tgt_y, np.full(len(sx), len(labels) - 1)]))
+    edges = np.concatenate(edges, axis=1) if edges else np.zeros((5, 0), dtype=np.int64)
+
+    action = edges[4]
     if randomise_actions:
-        for node in graph.nodes:
-            actions = [e[2]['action'] for e in graph.edges(node, data=True)]
-            edges = {(n1, n2): d for n1, n2, d in graph.edges(node, data=True)}
-            for e in edges:
-                ri = randint(0, len(actions) - 1)
-                graph.edges[e]['action'] = actions[ri]
-                del actions[ri]
-            nx.set_edge_attributes(graph, edges)
+        # Permute the action labels among the edges leaving each node: sort the edges by source
+        # node then by a random key and hand out the labels of the source in their original order
+        rng = np.random.default_rng(seed)
+        source = edges[1] * width + edges[0]
+        keys = rng.random(len(source))
+        shuffled = np.empty_like(action)
+        shuffled[np.lexsort((keys, source))] = action[np.argsort(source, kind='stable')]
+        action = shuffled
+
+    # Add the edges with each action label and distance in one call, networkx copies the attributes
+    # into each edge. The distance stays with the geometry of the edge when the actions are randomised.
+    sources = list(zip(*edges[:2].tolist()))
+    targets = list(zip(*edges[2:4].tolist()))
+    group = action * len(labels) + edges[4]
+    order = np.lexsort((edges[1] * width + edges[0], group))
+    starts = np.flatnonzero(np.diff(group[order], prepend=-1))
+    for start, end in zip(starts.tolist(), starts[1:].tolist() + [len(order)]):
+        label, dist = labels[action[order[start]]][0], labels[edges[4, order[start]]][1]
+        attrs = {'action': label} if dist is None else {'action': label, 'distance': dist}
+        graph.add_edges_from(((sources[i], targets[i]) for i in order[start:end].tolist()), **attrs)
     return graph
 
 
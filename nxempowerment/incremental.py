@@ -0,0 +1,80 @@
+import logging
+
+from typing import Hashable, Iterable, Set, Tuple
+
+import networkx as nx
+
+from nxempowerment.empowerment import node_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+
+def affected_nodes(graph: nx.Graph, sources: Iterable[Hashable], num_steps: int) -> Set[Hashable]:
+    """
+    Nodes whose num_steps reachable set can include an edge leaving one of sources.
+
+    An edge (u, v) is only used by an n step walk from w if w reaches u in at most n - 1 steps,
+    so these are the nodes within num_steps - 1 reverse hops of the sources, including the sources.
+    """
+    pred = graph.pred if graph.is_directed() else graph.adj
+    seen = {node for node in sources if node in graph}
+    frontier = list(seen)
+    for _ in range(max(num_steps, 1) - 1):
+        next_frontier = []
+        for n in frontier:
+            for m in pred[n]:
+                if m not in seen:
+                    seen.add(m)
+                    next_frontier.append(m)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return seen
+
+
+def update_graph_node_empowerment(graph: nx.Graph,
+                                  previous: dict,
+                                  num_steps: int,
+                                  added_edges: Iterable[Tuple] = (),
+                                  removed_edges: Iterable[Tuple] = (),
+                                  added_nodes: Iterable[Hashable] = (),
+                                  removed_nodes: Iterable[Hashable] = ()) -> dict:
+    """
+    Update the result of graph_node_empowerment() after edges or nodes have been added to or removed from the graph.
+
+    Only the nodes whose reachable set can change are recomputed, see affected_nodes(). The work is
+    proportional to the neighbourhood of the edits rather than the size of the graph.
+
+    :param graph: the graph after the edits
+    :param previous: the result of graph_node_empowerment() for the graph before the edits, with the same num_steps
+    :param num_steps: the empowerment horizon
+    :param added_edges: edges (u, v) added to the graph. Nodes added with the edges are computed too.
+    :param removed_edges: edges (u, v) removed from the graph, including the edges of removed nodes.
+                          Removed nodes are dropped from the result.
+    :param added_nodes: nodes added to the graph, needed for nodes added without edges
+    :param removed_nodes: nodes removed from the graph, needed for nodes removed without edges
+    :return: dict of node: empowerment for the edited graph
+    """
+    empowerment = previous.copy()
+    sources = set()
+    for edges in (added_edges, removed_edges):
+        for edge in edges:
+            u, v = edge[:2]
+            sources.add(u)
+            if not graph.is_directed():
+                sources.add(v)
+            for node in (u, v):
+                if node not in graph:
+                    empowerment.pop(node, None)
+                elif node not in previous:
+                    sources.add(node)
+    for node in removed_nodes:
+        empowerment.pop(node, None)
+    sources.update(added_nodes)
+
+    affected = affected_nodes(graph, sources, num_steps)
+    logger.info("Recomputing Empowerment for %s of %s nodes", len(affected), graph.number_of_nodes())
+    for node in affected:
+        empowerment[node] = node_empowerment(graph, node, num_steps)
+    return empowerment
@@ -0,0 +1,80 @@
+import logging
+import time
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Called with the number of sources searched, the total and the estimated seconds remaining
+ProgressCallback = Callable[[int, int, Optional[float]], None]
+
+
+class EmpowermentStats:
+    """
+    Instrumentation of an empowerment run, filled in when passed as stats to graph_node_empowerment().
+
+    phases holds the seconds spent in each phase: 'compile', 'search' and 'write_back'. The per source
+    arrays are aligned with the compiled node order and only filled by the 'frontier' method:
+    nodes_expanded is the number of nodes whose successors were scanned, edges_traversed the number
+    of edges scanned and peak_frontier the largest breadth first search level.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.nodes_expanded: Optional[np.ndarray] = None
+        self.edges_traversed: Optional[np.ndarray] = None
+        self.peak_frontier: Optional[np.ndarray] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def allocate(self, num_sources: int):
+        self.nodes_expanded = np.zeros(num_sources, dtype=np.int64)
+        self.edges_traversed = np.zeros(num_sources, dtype=np.int64)
+        self.peak_frontier = np.zeros(num_sources, dtype=np.int64)
+
+    def summary(self) -> dict:
+        summary = {'{}_seconds'.format(name): seconds for name, seconds in self.phases.items()}
+        if self.nodes_expanded is not None and len(self.nodes_expanded):
+            summary.update(nodes_expanded=int(self.nodes_expanded.sum()),
+                           edges_traversed=int(self.edges_traversed.sum()),
+                           peak_frontier=int(self.peak_frontier.max()),
+                           most_expensive_source=int(self.edges_traversed.argmax()))
+        return summary
+
+    def log(self, level: int = logging.INFO):
+        logger.log(level, "Empowerment run %s", ', '.join('{}={}'.format(k, v) for k, v in self.summary().items()))
+
+
+class Progress:
+    """Calls a progress callback with an ETA at most every interval seconds"""
+
+    def __init__(self, callback: ProgressCallback, total: int, interval: float = 1.0):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def update(self, done: int):
+        now = time.perf_counter()
+        if now - self.last < self.interval and done < self.total:
+            return
+        self.last = now
+        eta = (now - self.start) / done * (self.total - done) if done else None
+        self.callback(done, self.total, eta)
+
+
+def log_progress(done: int, total: int, eta: Optional[float]):
+    """A progress callback that logs the progress and ETA"""
+    logger.info("Searched %s of %s sources (%.1f%%), ETA %s", done, total, 100 * done / total if total else 100,
+                '{:.0f}s'.format(eta) if eta is not None else 'unknown')
@@ -0,0 +1,100 @@
+import logging
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple
+
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph
+
+
+logger = logging.getLogger(__name__)
+
+# Each worker is given several chunks so that an unlucky, expensive chunk does not leave the others idle
+CHUNKS_PER_WORKER = 8
+
+# The CompiledGraph of a worker process, opened from the memory mapped CSR arrays by _init_worker()
+_worker_graph = None
+
+
+def chunk_sources(compiled: CompiledGraph, num_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split the node indices into contiguous ranges of roughly equal estimated search cost.
+
+    The cost of a search from a node is estimated by the size of its two hop neighbourhood, 1 + out degree
+    + the out degree of each successor, so that the few hub nodes of a street network with a skewed degree
+    distribution end up in smaller chunks.
+
+    :return: list of (start, end) node index ranges
+    """
+    num_nodes = compiled.number_of_nodes()
+    if num_nodes == 0:
+        return []
+    degree = compiled.degree()
+    second = np.zeros(num_nodes, dtype=np.int64)
+    rows = np.flatnonzero(degree > 0)
+    if len(rows):
+        second[rows] = np.add.reduceat(degree[compiled.indices], compiled.indptr[rows])
+    cumulative = np.cumsum(1 + degree + second)
+    targets = cumulative[-1] * np.arange(1, num_chunks) / num_chunks
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(cumulative, targets) + 1, [num_nodes]]))
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def save_csr(compiled: CompiledGraph, directory: str):
+    """Write the CSR arrays of the graph to .npy files in directory, see load_csr()"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'indptr.npy'), compiled.indptr)
+    np.save(os.path.join(directory, 'indices.npy'), compiled.indices)
+
+
+def load_csr(directory: str) -> CompiledGraph:
+    """
+    Open the CSR arrays written by save_csr() memory mapped read only.
+
+    The nodes are the node indices, the node keys stay with the process that saved the graph.
+    """
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r')
+    return CompiledGraph(nodes=range(len(indptr) - 1), indptr=indptr, indices=indices)
+
+
+def _init_worker(directory: str):
+    global _worker_graph
+    _worker_graph = load_csr(directory)
+
+
+def _search_chunk(start: int, end: int, max_steps: int) -> Tuple[int, np.ndarray]:
+    counts = np.empty((end - start, max_steps), dtype=np.int64)
+    for i in range(start, end):
+        counts[i - start] = _worker_graph.frontier_counts(i, max_steps)
+    return start, counts
+
+
+def parallel_frontier_counts(compiled: CompiledGraph, max_steps: int, workers: int) -> np.ndarray:
+    """
+    Run the frontier search from every node in a pool of worker processes.
+
+    The CSR arrays are written once to memory mapped .npy files which every worker opens read only,
+    so the graph is shared through the page cache rather than pickled per task. The result does not
+    depend on the number of workers.
+
+    :param compiled: the compiled graph
+    :param max_steps: the largest horizon
+    :param workers: number of worker processes
+    :return: array of shape (number of nodes, max_steps) of the counts returned by frontier_counts()
+    """
+    counts = np.empty((compiled.number_of_nodes(), max_steps), dtype=np.int64)
+    chunks = chunk_sources(compiled, workers * CHUNKS_PER_WORKER)
+    logger.info("Searching from %s nodes in %s chunks with %s workers", compiled.number_of_nodes(), len(chunks),
+                workers)
+    with tempfile.TemporaryDirectory(prefix='nxempowerment-') as tmpdir:
+        save_csr(compiled, tmpdir)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tmpdir,)) as executor:
+            futures = [executor.submit(_search_chunk, start, end, max_steps) for start, end in chunks]
+            for future in as_completed(futures):
+                start, chunk_counts = future.result()
+                counts[start:start + len(chunk_counts)] = chunk_counts
+    return counts
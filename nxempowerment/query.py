@@ -0,0 +1,120 @@
+import logging
+
+from typing import Dict, Hashable, Iterable, List, Set, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, compile_graph
+from nxempowerment.utils import count_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+BBox = Tuple[float, float, float, float]
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over node positions for fast bounding box queries.
+
+    Nodes are bucketed into square cells of cell_size, a query only looks at the nodes of the cells
+    the box overlaps.
+
+    :param graph: a networkx graph whose nodes have a position attribute
+    :param pos: name of the node attribute holding the (x, y) position
+    :param cell_size: side of a cell, by default chosen for about one node per cell
+    """
+
+    def __init__(self, graph: nx.Graph, pos: str = 'pos', cell_size: float = None):
+        positions = nx.get_node_attributes(graph, pos)
+        if not positions:
+            raise ValueError("No node has a '{}' attribute".format(pos))
+        self.nodes = list(positions)
+        self.xy = np.array([positions[node] for node in self.nodes], dtype=np.float64)
+        self.origin = self.xy.min(axis=0)
+        if cell_size is None:
+            extent = float(np.ptp(self.xy, axis=0).max())
+            cell_size = extent / np.sqrt(len(self.nodes)) if extent > 0 else 1.0
+        self.cell_size = cell_size
+        cells = np.floor((self.xy - self.origin) / cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        keys, starts = np.unique(cells[order], axis=0, return_index=True)
+        self.buckets = {(int(cx), int(cy)): bucket
+                        for (cx, cy), bucket in zip(keys, np.split(order, starts[1:]))}
+
+    def query(self, bbox: BBox) -> List[Hashable]:
+        """
+        :param bbox: (xmin, ymin, xmax, ymax), inclusive
+        :return: the nodes inside the box
+        """
+        xmin, ymin, xmax, ymax = bbox
+        lo = np.floor((np.array([xmin, ymin]) - self.origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((np.array([xmax, ymax]) - self.origin) / self.cell_size).astype(np.int64)
+        if (hi - lo + 1).prod() > len(self.buckets):
+            keys = [key for key in self.buckets if lo[0] <= key[0] <= hi[0] and lo[1] <= key[1] <= hi[1]]
+        else:
+            keys = [(cx, cy) for cx in range(lo[0], hi[0] + 1) for cy in range(lo[1], hi[1] + 1)]
+        candidates = [self.buckets[key] for key in keys if key in self.buckets]
+        if not candidates:
+            return []
+        candidates = np.concatenate(candidates)
+        x, y = self.xy[candidates, 0], self.xy[candidates, 1]
+        inside = candidates[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+        return [self.nodes[i] for i in np.sort(inside)]
+
+
+def halo(graph: nx.Graph, nodes: Iterable[Hashable], num_steps: int) -> Set[Hashable]:
+    """The nodes reachable from any of nodes in at most num_steps steps, including the nodes themselves"""
+    seen = set(nodes)
+    frontier = list(seen)
+    for _ in range(num_steps):
+        next_frontier = []
+        for n in frontier:
+            for m in graph[n]:
+                if m not in seen:
+                    seen.add(m)
+                    next_frontier.append(m)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return seen
+
+
+def query_node_empowerment(graph: Union[nx.Graph, CompiledGraph], nodes: Iterable[Hashable],
+                           num_steps: int) -> Dict[Hashable, float]:
+    """
+    Compute empowerment for a subset of the nodes of the graph.
+
+    Only the num_steps hop halo of the nodes is visited: it is compiled on its own and searched from
+    the requested nodes, which gives the same values as on the whole graph.
+
+    :param graph: a networkx graph, or a CompiledGraph which is searched directly
+    :param nodes: the nodes to compute
+    :param num_steps: the empowerment horizon
+    :return: dict of node: empowerment for the requested nodes
+    """
+    num_steps = max(num_steps, 1)
+    nodes = list(dict.fromkeys(nodes))
+    if isinstance(graph, CompiledGraph):
+        compiled = graph
+    else:
+        region = halo(graph, nodes, num_steps)
+        logger.info("Computing Empowerment for %s nodes with a halo of %s of %s nodes",
+                    len(nodes), len(region), graph.number_of_nodes())
+        compiled = compile_graph(graph.subgraph(region), distance=None)
+    return {node: count_empowerment(compiled.frontier_counts(compiled.index[node], num_steps)[-1])
+            for node in nodes}
+
+
+def bbox_node_empowerment(graph: nx.Graph, bbox: BBox, num_steps: int,
+                          index: SpatialIndex = None) -> Dict[Hashable, float]:
+    """
+    Compute empowerment for the nodes whose position lies in a bounding box.
+
+    :param bbox: (xmin, ymin, xmax, ymax), inclusive
+    :param index: a SpatialIndex of the graph, build one to reuse it across queries
+    :return: dict of node: empowerment for the nodes in the box
+    """
+    index = index or SpatialIndex(graph)
+    return query_node_empowerment(graph, index.query(bbox), num_steps)
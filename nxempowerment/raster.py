@@ -0,0 +1,191 @@
+import logging
+
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph
+from nxempowerment.grid_world import _map_array
+from nxempowerment.reachability import popcount
+from nxempowerment.utils import DEFAULT_MAX_MEMORY, counts_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+# Measured cost of a cell reached by a bounded search relative to a bitset word update of a tile
+SEARCH_COST = 25
+
+_ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+_DIAGONAL = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+
+
+def _or_shifted(target: np.ndarray, source: np.ndarray, shift: int, buffer: np.ndarray):
+    """
+    target |= source shifted towards higher bits by shift, for multiword bitsets stored along axis 0
+    least significant word first. buffer is scratch space of the same shape as target.
+    """
+    num_words = len(source)
+    up = shift >= 0
+    q, r = divmod(abs(shift), 64)
+    # Each result word combines a whole word shift of q with a bit shift of r from the neighbouring word
+    terms = [(q, r, up)]
+    if r:
+        terms.append((q + 1, 64 - r, not up))
+    for words, bits, left in terms:
+        length = num_words - words
+        if length <= 0:
+            continue
+        src = source[:length] if up else source[words:]
+        dst = target[words:] if up else target[:length]
+        out = buffer[:length]
+        (np.left_shift if left else np.right_shift)(src, np.uint64(bits), out=out)
+        np.bitwise_or(dst, out, out=dst)
+
+
+def _window_sum(values: np.ndarray, radius: int) -> np.ndarray:
+    """Sum of values over the (2 * radius + 1) square window around every cell, zero outside the array"""
+    padded = np.pad(values.astype(np.int64), ((radius + 1, radius), (radius + 1, radius)))
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    size = 2 * radius + 1
+    return (integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size])
+
+
+def _grid_graph(passable: np.ndarray, moves: List[Tuple[int, int]]) -> CompiledGraph:
+    """The grid world of the map as a CompiledGraph over the open cells in row major order"""
+    height, width = passable.shape
+    node_of = np.full(passable.shape, -1, dtype=np.int64)
+    cells = np.flatnonzero(passable)
+    node_of.flat[cells] = np.arange(len(cells))
+    ys, xs = np.divmod(cells, width)
+    sources, targets = [], []
+    for dx, dy in moves:
+        tx, ty = xs + dx, ys + dy
+        valid = (tx >= 0) & (tx < width) & (ty >= 0) & (ty < height)
+        valid[valid] = passable[ty[valid], tx[valid]]
+        sources.append(np.flatnonzero(valid))
+        targets.append(node_of[ty[valid], tx[valid]])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    order = np.argsort(sources, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(cells)))])
+    return CompiledGraph(nodes=range(len(cells)), indptr=indptr, indices=targets[order].astype(np.int32))
+
+
+def grid_reachable_counts(_map: Union[List[List], np.ndarray], num_steps: int, diagonals: bool = False,
+                          max_memory: int = DEFAULT_MAX_MEMORY) -> np.ndarray:
+    """
+    Number of cells reachable from every cell of a grid world in at most num_steps steps, including the cell.
+
+    Works directly on the 0/1 map used by generate_grid_world() where row index is y and column index is x.
+    Every cell keeps a bitset over the offsets (dx, dy) of the (2n + 1) x (2n + 1) window around it and
+    the bitsets are propagated with shifted array operations, one step at a time, over whole tiles of the
+    map at once. Cells whose window contains no wall or map edge have the closed form count of open space
+    and tiles made only of such cells are skipped.
+
+    The bitsets grow with the square of the horizon and the tiles that fit in max_memory shrink until
+    their halo dominates. When the bitset work per cell, n * num_words * (padded tile / tile) ** 2 word
+    updates, is larger than SEARCH_COST times the open space count, or no tile fits, the remaining cells
+    are instead searched one at a time with a bounded breadth first search, see
+    CompiledGraph.frontier_counts().
+
+    :param _map: list of rows or 2D array, 1 for a cell and 0 for a wall, short rows are padded with walls
+    :param num_steps: the horizon
+    :param diagonals: 8 connectivity as generate_grid_world(..., diagonals=True), otherwise 4 connectivity
+    :param max_memory: approximate memory budget in bytes for the bitsets of one tile
+    :return: array of counts of the shape of the padded map, 0 for walls
+    """
+    passable = _map_array(_map)
+    height, width = passable.shape
+    n = max(num_steps, 1)
+    moves = _ORTHOGONAL + _DIAGONAL if diagonals else _ORTHOGONAL
+
+    # Offset (dx, dy) is bit (dy + n) * stride + (dx + n). The extra guard column catches bits that wrap
+    # around a row of the window when shifted in x, it is cleared after every step.
+    stride = 2 * n + 2
+    num_bits = (2 * n + 1) * stride
+    num_words = (num_bits + 63) // 64
+    window = np.zeros(num_words * 64, dtype=bool)
+    window[:num_bits] = True
+    window[2 * n + 1::stride] = False
+    window = np.packbits(window, bitorder='little').view('<u8').astype(np.uint64).reshape(num_words, 1, 1)
+    origin = n * stride + n
+
+    counts = np.zeros((height, width), dtype=np.int64)
+    if diagonals:
+        open_count = (2 * n + 1) ** 2
+    else:
+        open_count = 2 * n * n + 2 * n + 1
+    walls = _window_sum(~passable, n)
+    # The window must also lie inside the map
+    inside = np.zeros_like(passable)
+    inside[n:height - n, n:width - n] = True
+    open_space = passable & inside & (walls == 0)
+    counts[open_space] = open_count
+
+    # Square tiles whose bitsets, including a halo of n + 1 cells on each side, fit in the memory budget.
+    # A tile holds about four arrays of num_words words per padded cell.
+    halo = n + 1
+    side = int(np.sqrt(max_memory // (4 * num_words * 8)))
+    tile = side - 2 * halo
+    if tile < 1 or n * num_words * (side / tile) ** 2 > SEARCH_COST * open_count:
+        todo = np.flatnonzero((passable & ~open_space).ravel())
+        logger.debug("Grid reachability of a %s x %s map with %s bounded searches", width, height, len(todo))
+        compiled = _grid_graph(passable, moves)
+        nodes = np.cumsum(passable.ravel()) - 1
+        counts.flat[todo] = [compiled.frontier_counts(i, n)[-1] for i in nodes[todo].tolist()]
+        return counts
+    padded = np.pad(passable, halo)
+    logger.debug("Grid reachability of a %s x %s map in tiles of %s cells with %s word bitsets",
+                 width, height, tile, num_words)
+
+    for y0 in range(0, height, tile):
+        for x0 in range(0, width, tile):
+            y1, x1 = min(height, y0 + tile), min(width, x0 + tile)
+            if not (passable[y0:y1, x0:x1] & ~open_space[y0:y1, x0:x1]).any():
+                continue
+            cells_passable = padded[y0:y1 + 2 * halo, x0:x1 + 2 * halo]
+            reach = np.zeros((num_words,) + cells_passable.shape, dtype=np.uint64)
+            reach[origin // 64][cells_passable] = np.uint64(1) << np.uint64(origin % 64)
+            rows, cols = cells_passable.shape
+            buffer = np.empty((num_words, rows - 2, cols - 2), dtype=np.uint64)
+            for step in range(1, n + 1):
+                # After step k only the window rows -k..k can hold bits
+                lo = (n - step) * stride // 64
+                hi = -(-(n + step + 1) * stride // 64)
+                updated = reach[lo:hi].copy()
+                for dx, dy in moves:
+                    # Cell v reaches v + o if its neighbour u = v + (dx, dy) reaches u + o - (dx, dy)
+                    _or_shifted(updated[:, 1:-1, 1:-1], reach[lo:hi, 1 + dy:rows - 1 + dy, 1 + dx:cols - 1 + dx],
+                                dx + dy * stride, buffer)
+                updated &= window[lo:hi]
+                updated[:, ~cells_passable] = 0
+                reach[lo:hi] = updated
+            interior = reach[:, halo:halo + y1 - y0, halo:halo + x1 - x0]
+            tile_counts = popcount(np.ascontiguousarray(interior.reshape(num_words, -1).T))
+            tile_counts = tile_counts.reshape(y1 - y0, x1 - x0)
+            todo = ~open_space[y0:y1, x0:x1]
+            counts[y0:y1, x0:x1][todo] = tile_counts[todo]
+    return counts
+
+
+def grid_empowerment(_map: Union[List[List], np.ndarray], num_steps: int, diagonals: bool = False,
+                     **kwargs) -> np.ndarray:
+    """
+    Empowerment of every cell of a grid world, computed from the map without building a graph.
+
+    Gives the same values as graph_node_empowerment() on generate_grid_world(_map, diagonals).
+
+    :param kwargs: passed to grid_reachable_counts()
+    :return: array of the same shape as the map where [y, x] is the empowerment of cell (x, y), NaN for walls
+    """
+    counts = grid_reachable_counts(_map, num_steps, diagonals, **kwargs)
+    empowerment = counts_empowerment(counts)
+    empowerment[~_map_array(_map)] = np.nan
+    return empowerment
+
+
+def grid_empowerment_dict(_map: Union[List[List], np.ndarray], num_steps: int, diagonals: bool = False,
+                          **kwargs) -> Dict[Tuple[int, int], float]:
+    """As grid_empowerment() but as a dict of node: empowerment keyed by the (x, y) grid world nodes"""
+    empowerment = grid_empowerment(_map, num_steps, diagonals, **kwargs)
+    ys, xs = np.nonzero(~np.isnan(empowerment))
+    return {(int(x), int(y)): float(empowerment[y, x]) for y, x in zip(ys, xs)}
@@ -0,0 +1,84 @@
+import logging
+
+from typing import Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import DEFAULT_MAX_MEMORY
+
+
+logger = logging.getLogger(__name__)
+
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each row of a 2D uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def reachable_counts(graph: Union[nx.Graph, CompiledGraph], num_steps: int,
+                     max_memory: int = DEFAULT_MAX_MEMORY) -> np.ndarray:
+    """
+    Number of nodes reachable from every node in at most num_steps steps, including the node itself.
+
+    All nodes are computed together with the recurrence R_k(v) = {v} | union of R_k-1(u) over the
+    successors u of v, where the reachable sets are packed uint64 bitsets. The bits (target nodes)
+    are processed in column blocks sized so that a block, including the gather over every edge,
+    fits in max_memory bytes.
+
+    :param graph: a networkx graph or a CompiledGraph
+    :param num_steps: the horizon
+    :param max_memory: approximate memory budget in bytes for one block
+    :return: array of counts aligned with the compiled node order
+    """
+    return reachable_counts_horizons(graph, num_steps, max_memory)[:, -1]
+
+
+def reachable_counts_horizons(graph: Union[nx.Graph, CompiledGraph], max_steps: int,
+                              max_memory: int = DEFAULT_MAX_MEMORY) -> np.ndarray:
+    """
+    As reachable_counts() but for every horizon 1..max_steps in the same sweep.
+
+    :return: array of shape (number of nodes, max_steps) where column k - 1 holds the counts for horizon k
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    counts = np.zeros((num_nodes, max_steps), dtype=np.int64)
+    if num_nodes == 0:
+        return counts
+
+    # Only nodes with successors are updated, reduceat cannot express empty segments
+    rows = np.flatnonzero(compiled.degree() > 0)
+    starts = compiled.indptr[rows]
+
+    total_words = (num_nodes + 63) // 64
+    bytes_per_word = (2 * num_nodes + compiled.number_of_edges()) * 8
+    block_words = int(min(total_words, max(1, max_memory // bytes_per_word)))
+    logger.debug("Bitset reachability of %s nodes in blocks of %s words", num_nodes, block_words)
+
+    for w0 in range(0, total_words, block_words):
+        w1 = min(total_words, w0 + block_words)
+        block = np.zeros((num_nodes, w1 - w0), dtype=np.uint64)
+        # R_0(v) = {v} for the nodes whose bits fall in this block
+        members = np.arange(w0 * 64, min(w1 * 64, num_nodes))
+        block[members, (members >> 6) - w0] = np.left_shift(np.uint64(1), (members & 63).astype(np.uint64))
+        counts_block = np.zeros(num_nodes, dtype=np.int64)
+        for step in range(max_steps):
+            if len(rows) == 0:
+                updated = block
+            else:
+                updated = block.copy()
+                updated[rows] |= np.bitwise_or.reduceat(block[compiled.indices], starts, axis=0)
+            if step > 0 and np.array_equal(updated, block):
+                # The reachable sets within this block have converged, later horizons are unchanged
+                counts[:, step:] += counts_block[:, np.newaxis]
+                break
+            block = updated
+            counts_block = popcount(block)
+            counts[:, step] += counts_block
+    return counts
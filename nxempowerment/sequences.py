@@ -0,0 +1,83 @@
+import logging
+
+from typing import Sequence, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import DEFAULT_MAX_MEMORY
+
+
+logger = logging.getLogger(__name__)
+
+
+def action_sequences(num_actions: int, num_steps: int) -> np.ndarray:
+    """
+    Every sequence of num_steps actions as a (num_actions ** num_steps, num_steps) array of action indices.
+
+    Row s is the sequence whose digits in base num_actions are s, first action most significant, which is
+    the column order of apply_action_sequences().
+    """
+    digits = np.arange(num_actions ** num_steps)[:, np.newaxis] // num_actions ** np.arange(num_steps)[::-1]
+    return digits % num_actions
+
+
+def apply_action_sequences(graph: Union[nx.Graph, CompiledGraph], num_steps: int, sources: Sequence[int] = None,
+                           stay_on_missing: bool = False) -> np.ndarray:
+    """
+    Apply every sequence of num_steps actions to every start node at once with gathers from
+    CompiledGraph.action_table.
+
+    :param graph: a networkx graph or a CompiledGraph with labelled edges
+    :param num_steps: length of the action sequences
+    :param sources: start node indices, by default every node
+    :param stay_on_missing: an action without an edge leaves the agent in place, otherwise the sequence
+                            is invalid from that point on
+    :return: (len(sources), num_actions ** num_steps) array of end node indices in the order of
+             action_sequences(), -1 for invalid sequences
+    """
+    compiled = as_compiled(graph)
+    table = compiled.action_table
+    if sources is None:
+        sources = np.arange(compiled.number_of_nodes())
+    ends = np.asarray(sources, dtype=table.dtype)[:, np.newaxis]
+    for _ in range(num_steps):
+        following = table[np.maximum(ends, 0)]
+        following[ends < 0] = -1
+        if stay_on_missing:
+            following = np.where(following < 0, ends[..., np.newaxis], following)
+        ends = following.reshape(len(ends), -1)
+    return ends
+
+
+def sequence_end_counts(graph: Union[nx.Graph, CompiledGraph], num_steps: int, stay_on_missing: bool = False,
+                        max_memory: int = DEFAULT_MAX_MEMORY) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Number of action sequences of length num_steps leading from every node to every end node.
+
+    :param graph: a networkx graph or a CompiledGraph with labelled edges
+    :param num_steps: length of the action sequences
+    :param stay_on_missing: see apply_action_sequences(), otherwise invalid sequences are not counted
+    :param max_memory: approximate memory budget in bytes for the end states of one batch of start nodes
+    :return: COO arrays of start node index, end node index and number of sequences, sorted by start then end
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    num_sequences = len(compiled.actions) ** num_steps
+    # The last gather holds the end states three times over in int32 and int64
+    batch_size = max(1, max_memory // (16 * num_sequences))
+    logger.debug("Counting %s action sequences from %s nodes in batches of %s", num_sequences, num_nodes, batch_size)
+
+    starts, ends, counts = [], [], []
+    for start in range(0, num_nodes, batch_size):
+        sources = np.arange(start, min(start + batch_size, num_nodes))
+        reached = apply_action_sequences(compiled, num_steps, sources, stay_on_missing)
+        keys = (sources[:, np.newaxis] * num_nodes + reached)[reached >= 0]
+        keys, key_counts = np.unique(keys, return_counts=True)
+        starts.append(keys // num_nodes)
+        ends.append(keys % num_nodes)
+        counts.append(key_counts)
+    if not starts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(counts)
@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, compile_graph
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.parallel import load_csr, save_csr
+from nxempowerment.query import SpatialIndex
+from nxempowerment.utils import count_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# Queries of up to this many nodes are searched on their own rather than computing the whole graph
+SUBSET_LIMIT = 1000
+# Whole graph methods giving the exact counts the subset searches give
+EXACT_METHODS = ('frontier', 'bitset')
+
+# The CompiledGraphs of a worker process by directory, opened from memory mapped CSR arrays
+_worker_graphs: Dict[str, CompiledGraph] = {}
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _worker_graph(directory: str) -> CompiledGraph:
+    if directory not in _worker_graphs:
+        _worker_graphs[directory] = load_csr(directory)
+    return _worker_graphs[directory]
+
+
+def _init_worker(root: str):
+    # Open the graphs served when the worker starts, graphs added later are opened on their first request
+    for name in os.listdir(root):
+        _worker_graph(os.path.join(root, name))
+
+
+def _graph_empowerment(directory: str, num_steps: int, method: str) -> np.ndarray:
+    compiled = _worker_graph(directory)
+    empowerment = graph_node_empowerment(compiled, num_steps, method=method)
+    return np.array([empowerment[i] for i in compiled.nodes])
+
+
+def _subset_empowerment(directory: str, sources: List[int], num_steps: int) -> List[float]:
+    compiled = _worker_graph(directory)
+    return [count_empowerment(compiled.frontier_counts(i, num_steps)[-1]) for i in sources]
+
+
+def _parse_node(text: str, index: Dict[Hashable, int]) -> Hashable:
+    """
+    Nodes are given as JSON, lists become tuples so grid world nodes can be written [x, y]. Graphs read
+    from graphml have string node ids, so the text itself is used when the parsed node is not in index.
+    """
+    try:
+        node = json.loads(text)
+    except ValueError:
+        return text
+    node = tuple(node) if isinstance(node, list) else node
+    return node if node in index or text not in index else text
+
+
+def _position_graph(graph: nx.Graph) -> Optional[nx.Graph]:
+    """The graph if its nodes have a 'pos', else a graph of the nodes positioned by their 'x' and 'y' as in OSMnx"""
+    if any('pos' in data for _, data in graph.nodes(data=True)):
+        return graph
+    positioned = nx.Graph()
+    positioned.add_nodes_from((node, {'pos': (float(data['x']), float(data['y']))})
+                              for node, data in graph.nodes(data=True) if 'x' in data and 'y' in data)
+    return positioned if positioned.number_of_nodes() else None
+
+
+class EmpowermentService:
+    """
+    Local empowerment query service holding compiled graphs and computed results in memory.
+
+    Requests for the whole graph, or for more than SUBSET_LIMIT nodes, compute the empowerment of every
+    node once per graph and horizon and keep it. Concurrent requests for the same graph and horizon
+    share one computation. Smaller queries search only the requested nodes unless the whole graph has
+    already been computed. Computations run in a process pool so the event loop stays responsive.
+
+    The CSR arrays of every graph are written once to memory mapped .npy files in a temporary directory.
+    Each worker opens a graph once, in the pool initializer or on its first request, and requests only
+    carry the graph's directory and node indices.
+
+    HTTP GET endpoints, all returning JSON:
+      /graphs                                      names and sizes of the graphs
+      /empowerment?graph=g&steps=n                 every node as a list of [node, empowerment] pairs
+      /empowerment?graph=g&steps=n&node=[x,y]      one or more nodes, node given as JSON, repeatable
+      /empowerment?graph=g&steps=n&bbox=x0,y0,x1,y1 the nodes whose 'pos', or 'x' and 'y', lie in the box
+
+    :param graphs: dict of name: networkx graph
+    :param workers: size of the process pool
+    :param method: empowerment method for whole graph computations, one of EXACT_METHODS so that whole
+                   graph and subset queries agree, see graph_node_empowerment()
+    :param executor: run computations in this process pool rather than a new one. Thread pools are
+                     rejected, the threads would share the search workspace of each CompiledGraph.
+    """
+
+    def __init__(self, graphs: Dict[str, nx.Graph] = None, workers: int = None, method: str = 'frontier',
+                 executor: Executor = None):
+        if method not in EXACT_METHODS:
+            raise ValueError("The service only supports the exact methods {}, subset queries are exact searches"
+                             .format(', '.join(EXACT_METHODS)))
+        if isinstance(executor, ThreadPoolExecutor):
+            raise ValueError("Computations must run in processes, a CompiledGraph is not thread safe")
+        self.compiled: Dict[str, CompiledGraph] = {}
+        self.directories: Dict[str, str] = {}
+        self.indexes: Dict[str, SpatialIndex] = {}
+        # Keyed by graph directory and horizon, so a replaced graph never shares results with its successor
+        self.results: Dict[Tuple[str, int], np.ndarray] = {}
+        self.pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.method = method
+        self.computations = 0
+        self._tmpdir = tempfile.TemporaryDirectory(prefix='nxempowerment-service-')
+        for name, graph in (graphs or {}).items():
+            self.add_graph(name, graph)
+        # Forked workers would inherit the open client sockets and hold connections open after they close
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                                        initializer=_init_worker, initargs=(self._tmpdir.name,))
+
+    def add_graph(self, name: str, graph: nx.Graph):
+        previous = self.directories.get(name)
+        self.compiled[name] = compile_graph(graph)
+        # A new directory for every graph added, workers may still hold a replaced graph of the same name
+        self.directories[name] = os.path.join(self._tmpdir.name, str(len(os.listdir(self._tmpdir.name))))
+        save_csr(self.compiled[name], self.directories[name])
+        positioned = _position_graph(graph)
+        if positioned is not None:
+            self.indexes[name] = SpatialIndex(positioned)
+        else:
+            self.indexes.pop(name, None)
+        # Results of a graph of the same name are stale, requests already awaiting its computations keep
+        # their futures and answer for the graph they started with
+        self.results = {key: value for key, value in self.results.items() if key[0] != previous}
+        self.pending = {key: value for key, value in self.pending.items() if key[0] != previous}
+        logger.info("Serving graph %s of %s nodes", name, graph.number_of_nodes())
+
+    def _graph(self, name: str) -> CompiledGraph:
+        if name not in self.compiled:
+            raise ServiceError(404, "Unknown graph {}".format(name))
+        return self.compiled[name]
+
+    async def graph_empowerment(self, name: str, num_steps: int) -> np.ndarray:
+        """Empowerment of every node in compiled node order, computed at most once per graph and horizon"""
+        self._graph(name)
+        key = (self.directories[name], max(num_steps, 1))
+        if key in self.results:
+            return self.results[key]
+        if key not in self.pending:
+            self.computations += 1
+            loop = asyncio.get_running_loop()
+            self.pending[key] = loop.run_in_executor(self.executor, _graph_empowerment, key[0], key[1], self.method)
+            logger.info("Computing %s step empowerment of graph %s", key[1], name)
+        future = self.pending[key]
+        try:
+            values = await asyncio.shield(future)
+        finally:
+            if future.done() and self.pending.get(key) is future:
+                del self.pending[key]
+        if self.directories.get(name) == key[0]:
+            self.results[key] = values
+        return values
+
+    async def node_empowerment(self, name: str, nodes: List[Hashable], num_steps: int) -> List[float]:
+        compiled = self._graph(name)
+        missing = [node for node in nodes if node not in compiled.index]
+        if missing:
+            raise ServiceError(404, "Unknown nodes {}".format(missing[:10]))
+        key = (self.directories[name], max(num_steps, 1))
+        if key in self.results or key in self.pending or len(nodes) > SUBSET_LIMIT:
+            values = await self.graph_empowerment(name, num_steps)
+            return [float(values[compiled.index[node]]) for node in nodes]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _subset_empowerment, self.directories[name],
+                                          [compiled.index[node] for node in nodes], max(num_steps, 1))
+
+    def bbox_nodes(self, name: str, bbox: Tuple[float, float, float, float]) -> List[Hashable]:
+        self._graph(name)
+        if name not in self.indexes:
+            raise ServiceError(400, "Graph {} has no node positions".format(name))
+        return self.indexes[name].query(bbox)
+
+    async def handle_query(self, target: str) -> dict:
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == '/graphs':
+            return {name: {'nodes': c.number_of_nodes(), 'edges': c.number_of_edges()}
+                    for name, c in self.compiled.items()}
+        if url.path != '/empowerment':
+            raise ServiceError(404, "Unknown path {}".format(url.path))
+        try:
+            name = params['graph'][0]
+            num_steps = int(params['steps'][0])
+            bbox = tuple(float(v) for v in params['bbox'][0].split(',')) if 'bbox' in params else None
+        except (KeyError, ValueError):
+            raise ServiceError(400, "Expected graph, integer steps and optionally node or bbox parameters")
+        if bbox is not None and len(bbox) != 4:
+            raise ServiceError(400, "bbox is xmin,ymin,xmax,ymax")
+
+        if bbox is not None:
+            nodes = self.bbox_nodes(name, bbox)
+        elif 'node' in params:
+            index = self._graph(name).index
+            nodes = [_parse_node(text, index) for text in params['node']]
+        else:
+            compiled = self._graph(name)
+            values = await self.graph_empowerment(name, num_steps)
+            return {'graph': name, 'steps': num_steps,
+                    'empowerment': [[node, value] for node, value in zip(compiled.nodes, values.tolist())]}
+        values = await self.node_empowerment(name, nodes, num_steps)
+        return {'graph': name, 'steps': num_steps,
+                'empowerment': [[node, value] for node, value in zip(nodes, values)]}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            # Skip the headers, every request is a GET
+            while (await reader.readline()).strip():
+                pass
+            try:
+                method, target, _ = request.decode('latin-1').split()
+                if method != 'GET':
+                    raise ServiceError(405, "Only GET is supported")
+                status, body = 200, await self.handle_query(target)
+            except ServiceError as e:
+                status, body = e.status, {'error': str(e)}
+            except ValueError:
+                status, body = 400, {'error': 'Malformed request'}
+            except Exception as e:
+                logger.exception("Failed to answer %s", request)
+                status, body = 500, {'error': str(e)}
+            payload = json.dumps(body).encode()
+            writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                         'Connection: close\r\n\r\n'.format(status, 'OK' if status == 200 else 'Error',
+                                                             len(payload)).encode())
+            writer.write(payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Start serving over TCP, or over the Unix socket at path if given"""
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=path)
+            logger.info("Empowerment service listening on %s", path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logger.info("Empowerment service listening on %s:%s", host, server.sockets[0].getsockname()[1])
+        return server
+
+    def close(self):
+        if sys.version_info >= (3, 9):
+            self.executor.shutdown(cancel_futures=True)
+        else:
+            # cancel_futures is new in Python 3.9, queued computations run to completion
+            self.executor.shutdown()
+        self._tmpdir.cleanup()
+
+
+def _load_graph(path: str) -> nx.Graph:
+    if path.endswith('.graphml'):
+        return nx.read_graphml(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+async def _serve(service: EmpowermentService, host: str, port: int, path: Optional[str]):
+    server = await service.start(host, port, path)
+    async with server:
+        await server.serve_forever()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Serve empowerment queries over HTTP")
+    parser.add_argument('graphs', nargs='+', help="name=path of a pickled networkx graph or a .graphml file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix-socket', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--method', default='frontier', choices=EXACT_METHODS)
+    args = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    graphs = dict(spec.split('=', 1) for spec in args.graphs)
+    service = EmpowermentService({name: _load_graph(path) for name, path in graphs.items()},
+                                 workers=args.workers, method=args.method)
+    try:
+        asyncio.run(_serve(service, args.host, args.port, args.unix_socket))
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import logging
+import math
+
+from typing import Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import DEFAULT_MAX_MEMORY
+
+
+logger = logging.getLogger(__name__)
+
+_INVERSE_POWERS = 2.0 ** -np.arange(66)
+
+
+def hyperloglog_relative_error(register_bits: int) -> float:
+    """Relative standard error of a HyperLogLog estimate with 2 ** register_bits registers"""
+    return 1.04 / math.sqrt(2 ** register_bits)
+
+
+def splitmix64(values: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Vectorized SplitMix64 hash of an integer array"""
+    with np.errstate(over='ignore'):
+        z = values.astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & 0xFFFFFFFFFFFFFFFF)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _initial_registers(num_nodes: int, register_bits: int, seed: int) -> np.ndarray:
+    num_registers = 2 ** register_bits
+    registers = np.zeros((num_nodes, num_registers), dtype=np.uint8)
+    hashes = splitmix64(np.arange(num_nodes), seed)
+    bucket = (hashes & np.uint64(num_registers - 1)).astype(np.int64)
+    rest = hashes >> np.uint64(register_bits)
+    # rho is the position of the lowest set bit of the remaining hash bits, counting from 1
+    with np.errstate(over='ignore'):
+        lowest = rest & (~rest + np.uint64(1))
+    rho = np.full(num_nodes, 64 - register_bits + 1, dtype=np.uint8)
+    nonzero = rest != 0
+    rho[nonzero] = np.log2(lowest[nonzero].astype(np.float64)).astype(np.uint8) + 1
+    registers[np.arange(num_nodes), bucket] = rho
+    return registers
+
+
+def _estimate(registers: np.ndarray) -> np.ndarray:
+    num_registers = registers.shape[1]
+    if num_registers == 16:
+        alpha = 0.673
+    elif num_registers == 32:
+        alpha = 0.697
+    elif num_registers == 64:
+        alpha = 0.709
+    else:
+        alpha = 0.7213 / (1 + 1.079 / num_registers)
+    raw = alpha * num_registers ** 2 / _INVERSE_POWERS[registers].sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    # Small range correction by linear counting
+    small = (raw <= 2.5 * num_registers) & (zeros > 0)
+    raw[small] = num_registers * np.log(num_registers / zeros[small])
+    return raw
+
+
+def hyperloglog_counts(graph: Union[nx.Graph, CompiledGraph], num_steps: int, register_bits: int = 8,
+                       seed: int = 0, max_memory: int = DEFAULT_MAX_MEMORY) -> np.ndarray:
+    """
+    Approximate number of nodes reachable from every node in at most num_steps steps, including the node.
+
+    In the style of ANF/HyperANF every node keeps a HyperLogLog sketch of its reachable set and the
+    sketches are merged (register wise maximum) along the edges once per step. Memory is
+    2 ** register_bits bytes per node and the relative standard error of each estimate is
+    hyperloglog_relative_error(register_bits).
+
+    :param graph: a networkx graph or a CompiledGraph
+    :param num_steps: the horizon
+    :param register_bits: log2 of the number of registers per sketch, between 4 and 16
+    :param seed: hash seed
+    :param max_memory: approximate memory budget in bytes for the registers gathered in one block of nodes
+    :return: array of estimated counts aligned with the compiled node order
+    """
+    if not 4 <= register_bits <= 16:
+        raise ValueError("register_bits must be between 4 and 16")
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    num_registers = 2 ** register_bits
+    registers = _initial_registers(num_nodes, register_bits, seed)
+    indptr = compiled.indptr
+
+    # Blocks of consecutive nodes whose incoming registers fit in max_memory
+    max_edges = max(1, max_memory // num_registers)
+    bounds = [0]
+    while bounds[-1] < num_nodes:
+        end = int(np.searchsorted(indptr, indptr[bounds[-1]] + max_edges, side='right')) - 1
+        bounds.append(min(num_nodes, max(end, bounds[-1] + 1)))
+
+    for step in range(num_steps):
+        updated = registers.copy()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            rows = np.flatnonzero(indptr[start + 1:end + 1] > indptr[start:end]) + start
+            if len(rows) == 0:
+                continue
+            e0, e1 = indptr[start], indptr[end]
+            merged = np.maximum.reduceat(registers[compiled.indices[e0:e1]], indptr[rows] - e0, axis=0)
+            np.maximum(updated[rows], merged, out=merged)
+            updated[rows] = merged
+        if np.array_equal(updated, registers):
+            break
+        registers = updated
+
+    estimates = np.empty(num_nodes)
+    block = max(1, max_memory // (num_registers * 8))
+    for start in range(0, num_nodes, block):
+        estimates[start:start + block] = _estimate(registers[start:start + block])
+    return estimates
@@ -0,0 +1,158 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.cache import _fingerprint
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.utils import count_empowerment
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def iter_graph_node_empowerment(graph: Union[nx.Graph, CompiledGraph], num_steps: int,
+                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                start: int = 0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Compute empowerment for every node of the graph in fixed size chunks.
+
+    Nodes are visited in the stable order of the compiled graph, so a run can be resumed from any
+    chunk boundary with start. Only one chunk of results is held in memory at a time.
+
+    :param graph: a networkx graph or a CompiledGraph. Pass a CompiledGraph to map the node indices
+                  back to nodes with its nodes attribute.
+    :param num_steps: the empowerment horizon
+    :param chunk_size: number of nodes per chunk
+    :param start: index of the first node to compute
+    :return: iterator of (node indices, empowerment values) arrays
+    """
+    compiled = as_compiled(graph)
+    num_steps = max(num_steps, 1)
+    for chunk_start in range(start, compiled.number_of_nodes(), chunk_size):
+        node_ids = np.arange(chunk_start, min(chunk_start + chunk_size, compiled.number_of_nodes()))
+        values = np.array([count_empowerment(compiled.frontier_counts(i, num_steps)[-1]) for i in node_ids])
+        yield node_ids, values
+
+
+def _run_identity(compiled: CompiledGraph, num_steps: int, chunk_size: int) -> dict:
+    """
+    What a checkpoint must match to be resumed: the structure of the graph, see cache.graph_fingerprint(),
+    the order its nodes are written in, the horizon and the chunk size
+    """
+    fingerprint, order = _fingerprint(compiled)
+    return {'num_nodes': compiled.number_of_nodes(), 'num_steps': num_steps, 'chunk_size': chunk_size,
+            'fingerprint': fingerprint, 'node_order': hashlib.sha256(order.astype(np.int64).tobytes()).hexdigest()}
+
+
+def _read_progress(path: Path, identity: dict) -> dict:
+    progress_path = Path(str(path) + '.progress')
+    if progress_path.exists():
+        with open(progress_path) as f:
+            progress = json.load(f)
+        if all(progress.get(key) == value for key, value in identity.items()):
+            return progress
+        logger.warning("Ignoring the checkpoint of %s which is for a different graph, horizon or chunk size", path)
+    return dict(identity, completed=0, offset=0)
+
+
+def _write_progress(path: Path, progress: dict):
+    # Replace the checkpoint atomically so an interrupted job never leaves a corrupt one
+    progress_path = Path(str(path) + '.progress')
+    tmp = Path(str(progress_path) + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp, progress_path)
+
+
+def write_graph_node_empowerment(graph: Union[nx.Graph, CompiledGraph], num_steps: int,
+                                 path: Union[str, Path], format: str = None,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = True) -> Path:
+    """
+    Stream the empowerment of every node to disk one chunk at a time, checkpointing after each chunk.
+
+    Formats:
+      'npy'     a memory mapped float64 array of one value per node in compiled node order
+      'csv'     rows of node index, node and empowerment
+      'parquet' a directory of part files with node_index, node and empowerment columns, requires pyarrow
+
+    Progress is recorded in path + '.progress' together with a fingerprint of the graph and the chunk
+    size. With resume a job that was interrupted continues from the last completed chunk if the graph,
+    its node order, the horizon and the chunk size are unchanged. A job that starts again replaces the
+    output, including the part files of an earlier parquet run.
+
+    :param graph: a networkx graph or a CompiledGraph
+    :param num_steps: the empowerment horizon
+    :param path: output file, or directory for parquet
+    :param format: one of 'npy', 'csv' or 'parquet', by default taken from the suffix of path
+    :param chunk_size: number of nodes per chunk
+    :param resume: continue from the checkpoint of an earlier run, otherwise start again
+    :return: the output path
+    """
+    path = Path(path)
+    format = format or path.suffix.lstrip('.')
+    if format not in ('npy', 'csv', 'parquet'):
+        raise ValueError("Unknown empowerment output format {}".format(format))
+    if format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing parquet requires pyarrow, pip install pyarrow")
+
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    identity = _run_identity(compiled, max(num_steps, 1), chunk_size)
+    progress = _read_progress(path, identity) if resume else None
+    if progress is None or not path.exists():
+        progress = dict(identity, completed=0, offset=0)
+    if progress['completed']:
+        logger.info("Resuming %s from node %s of %s", path, progress['completed'], num_nodes)
+
+    if format == 'npy':
+        mode = 'r+' if progress['completed'] else 'w+'
+        output = np.lib.format.open_memmap(path, mode=mode, dtype=np.float64, shape=(num_nodes,))
+    elif format == 'csv':
+        output = open(path, 'r+' if progress['completed'] else 'w', newline='')
+        # Drop any rows written after the last checkpoint
+        output.seek(progress['offset'])
+        output.truncate()
+        writer = csv.writer(output)
+        if not progress['completed']:
+            writer.writerow(['node_index', 'node', 'empowerment'])
+    else:
+        path.mkdir(parents=True, exist_ok=True)
+        if not progress['completed']:
+            for part in path.glob('part-*.parquet'):
+                part.unlink()
+
+    try:
+        for node_ids, values in iter_graph_node_empowerment(compiled, num_steps, chunk_size, progress['completed']):
+            if format == 'npy':
+                output[node_ids[0]:node_ids[-1] + 1] = values
+                output.flush()
+            elif format == 'csv':
+                writer.writerows(zip(node_ids.tolist(), (compiled.nodes[i] for i in node_ids), values.tolist()))
+                output.flush()
+                progress['offset'] = output.tell()
+            else:
+                table = pa.table({'node_index': node_ids,
+                                  'node': [str(compiled.nodes[i]) for i in node_ids],
+                                  'empowerment': values})
+                pq.write_table(table, path / 'part-{:09d}.parquet'.format(node_ids[0]))
+            progress['completed'] = int(node_ids[-1]) + 1
+            _write_progress(path, progress)
+            logger.info("Written empowerment for %s of %s nodes to %s", progress['completed'], num_nodes, path)
+    finally:
+        if format == 'csv':
+            output.close()
+    return path
@@ -0,0 +1,125 @@
+import logging
+
+from typing import Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import CompiledGraph, as_compiled
+from nxempowerment.sketch import splitmix64
+
+
+logger = logging.getLogger(__name__)
+
+# Members of a neighbourhood class searched, besides the first, to check that the class is symmetric
+VERIFY_SAMPLES = 4
+
+
+def short_cycle_counts(graph: Union[nx.Graph, CompiledGraph]) -> np.ndarray:
+    """
+    A hash of the number of triangles and of squares through every node, from its two hop walks.
+
+    A node u closes a triangle for every walk u -> w -> v with an edge u -> v, and a square for every
+    pair of walks u -> w -> v, u -> w' -> v with v != u. These are the cycles colour refinement cannot
+    see, and in grid worlds they mark the walls and corners that change how many nodes are reachable.
+    Memory is proportional to the number of two hop walks.
+
+    :return: array aligned with the compiled node order
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    degree = compiled.degree()
+    sources = np.repeat(np.arange(num_nodes, dtype=np.int64), degree)
+    middle = compiled.indices.astype(np.int64)
+    ends = compiled.gather(middle).astype(np.int64)
+    walks, multiplicity = np.unique(np.repeat(sources, degree[middle]) * num_nodes + ends, return_counts=True)
+    start, end = np.divmod(walks, num_nodes)
+    closed = start != end
+    squares = np.bincount(start[closed], weights=multiplicity[closed] * (multiplicity[closed] - 1) // 2,
+                          minlength=num_nodes)
+    triangle = closed & np.isin(walks, sources * num_nodes + middle)
+    triangles = np.bincount(start[triangle], weights=multiplicity[triangle], minlength=num_nodes)
+    return splitmix64(squares.astype(np.int64), seed=1) ^ splitmix64(triangles.astype(np.int64), seed=2)
+
+
+def neighbourhood_classes(graph: Union[nx.Graph, CompiledGraph], num_steps: int) -> np.ndarray:
+    """
+    Label every node with a hash of the structure of its num_steps hop out-neighbourhood.
+
+    Weisfeiler-Lehman colour refinement over successors, limited to num_steps rounds: the colour of a
+    node is repeatedly replaced by a hash of its colour and the multiset of its successors' colours,
+    with the multiset hashed as a sum of mixed colours so no sorting is needed. The colours start from
+    short_cycle_counts(), which tells apart neighbourhoods whose walks are alike but whose cycles differ.
+
+    :return: array of class labels 0..C-1 aligned with the compiled node order
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    _, colours = np.unique(short_cycle_counts(compiled), return_inverse=True)
+    colours = colours.reshape(-1)
+    rows = np.flatnonzero(compiled.degree() > 0)
+    starts = compiled.indptr[rows]
+    num_classes = int(colours.max(initial=-1)) + 1
+    for step in range(max(num_steps, 1)):
+        mixed = splitmix64(colours, seed=step)
+        neighbours = np.zeros(num_nodes, dtype=np.uint64)
+        if len(rows):
+            with np.errstate(over='ignore'):
+                neighbours[rows] = np.add.reduceat(mixed[compiled.indices], starts)
+        with np.errstate(over='ignore'):
+            signature = splitmix64(colours, seed=step + 1) ^ splitmix64(neighbours.view(np.int64), seed=step + 2)
+        _, colours = np.unique(signature, return_inverse=True)
+        colours = colours.reshape(-1)
+        if colours.max(initial=-1) + 1 == num_classes:
+            # The partition is stable, more rounds cannot split it further
+            break
+        num_classes = int(colours.max(initial=-1)) + 1
+    return colours
+
+
+def symmetric_reachable_counts(graph: Union[nx.Graph, CompiledGraph], num_steps: int,
+                               verify: bool = True) -> Tuple[np.ndarray, float]:
+    """
+    Number of nodes reachable from every node in at most num_steps steps, searching once per class of
+    structurally identical neighbourhoods, see neighbourhood_classes().
+
+    Colour refinement describes the walks from a node, not the nodes they reach, so it cannot prove that
+    the members of a class reach as many nodes (for example cycles of different length). With verify up to
+    VERIFY_SAMPLES further members of every class, spread over the class, are also searched and a class
+    whose members disagree is searched node by node. This is a sampled check: a class can still hide a
+    member that differs from every sampled one. Without verify the first member stands for its class.
+
+    :return: array of counts aligned with the compiled node order, and the fraction of nodes whose
+             search was saved (the cache hit rate)
+    """
+    compiled = as_compiled(graph)
+    num_nodes = compiled.number_of_nodes()
+    num_steps = max(num_steps, 1)
+    labels = neighbourhood_classes(compiled, num_steps)
+    _, first = np.unique(labels, return_index=True)
+    class_counts = np.array([compiled.frontier_counts(i, num_steps)[-1] for i in first], dtype=np.int64)
+    searches = len(first)
+    counts = class_counts[labels]
+
+    if verify:
+        order = np.argsort(labels, kind='stable')
+        bounds = np.concatenate([np.searchsorted(labels[order], np.arange(len(first))), [num_nodes]])
+        split = 0
+        for label in np.flatnonzero(np.diff(bounds) > 1):
+            members = order[bounds[label]:bounds[label + 1]]
+            positions = np.unique(np.linspace(0, len(members) - 1, min(len(members), VERIFY_SAMPLES + 1)).round())
+            sample = members[positions[1:].astype(np.int64)]
+            searches += len(sample)
+            if all(compiled.frontier_counts(i, num_steps)[-1] == class_counts[label] for i in sample):
+                continue
+            split += 1
+            for i in members:
+                counts[i] = compiled.frontier_counts(i, num_steps)[-1]
+            searches += len(members)
+        if split:
+            logger.warning("%s neighbourhood classes are not symmetric, their nodes were searched one by one", split)
+
+    hit_rate = 1 - searches / num_nodes if num_nodes else 0.0
+    logger.info("%s neighbourhood classes for %s nodes, %s searches, cache hit rate %.1f%%",
+                len(first), num_nodes, searches, 100 * hit_rate)
+    return counts, hit_rate
@@ -1,12 +1,29 @@
 
 import math
 
+import numpy as np
+
+
+# Default memory budget in bytes of the engines that work through the graph in blocks or batches
+DEFAULT_MAX_MEMORY = 256 * 1024 ** 2
 
 
 def logzero(k: float):
     return 0 if k == 0 else math.log(k, 2)
 
 
+def count_empowerment(count: int) -> float:
+    """Empowerment of a node from the number of nodes it can reach, counting the node itself"""
+    return logzero(max(int(count) - 1, 0))
+
+
+def counts_empowerment(counts: np.ndarray) -> np.ndarray:
+    """count_empowerment() of every entry of an array of counts, evaluated once per distinct count"""
+    values, inverse = np.unique(counts, return_inverse=True)
+    table = np.array([count_empowerment(v) for v in values.tolist()], dtype=np.float64)
+    return table[inverse].reshape(np.shape(counts))
+
+
 def sigfigs(value: float, sig_figs: int, min_value: float = 1e-06) -> str:
     if not isinstance(value, float):
         return str(value)
@@ -1,14 +1,24 @@
 import logging
+
+from pathlib import Path
+
 import networkx as nx
 import numpy as np
 
 import matplotlib.pyplot as plt
-from matplotlib.patches import ArrowStyle
+from matplotlib.collections import LineCollection, PolyCollection
 
 from nxempowerment.utils import sigfigs
 
 logger = logging.getLogger(__name__)
 
+# Graphs with more nodes than this are drawn with the fast renderer unless told otherwise
+FAST_RENDER_NODES = 2000
+# Labels are not drawn by the fast and edge measure renderers for graphs with more nodes than this
+MAX_LABELS = 500
+# Vector output of graphs with more nodes than this is replaced by PNG unless rasterized
+MAX_SVG_NODES = 20000
+
 
 def shorten_edge(src, tgt, factor=0.5):
     src = np.array(src)
@@ -16,9 +26,49 @@ def shorten_edge(src, tgt, factor=0.5):
     return src + ((tgt - src) * factor)
 
 
-def _draw_edge_measure(graph, pos, labels, cmap, node_color, node_size, vmax, vmin):
+def _node_positions(graph, pos):
+    """Node positions as an (N, 2) array in graph.nodes order and the index of each node"""
+    index = {node: i for i, node in enumerate(graph.nodes)}
+    xy = np.array([pos[node] for node in graph.nodes], dtype=np.float64).reshape(-1, 2)
+    return xy, index
+
+
+def _edge_endpoints(graph, index):
+    """Source and target node indices of every edge"""
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+    return edges[:, 0], edges[:, 1]
+
+
+def _draw_fast(graph, pos, labels, cmap, node_color, node_size, vmax, vmin, rasterized):
+    """
+    Draw all edges as one LineCollection and all nodes as one scatter, for graphs of many thousands of nodes.
+    """
+    ax = plt.gca()
+    xy, index = _node_positions(graph, pos)
+    src, tgt = _edge_endpoints(graph, index)
+    # Draw each pair of opposite edges once and leave out self loops
+    pairs = np.unique(np.sort(np.stack([src, tgt], axis=1), axis=1), axis=0)
+    src, tgt = pairs[pairs[:, 0] != pairs[:, 1]].T
+    edges = LineCollection(np.stack([xy[src], xy[tgt]], axis=1), colors='#000000', linewidths=0.5, alpha=0.3,
+                           rasterized=rasterized)
+    ax.add_collection(edges)
+    ax.scatter(xy[:, 0], xy[:, 1], s=node_size, c=node_color, cmap=cmap, vmin=vmin, vmax=vmax, zorder=2,
+               rasterized=rasterized)
+    if labels and graph.number_of_nodes() <= MAX_LABELS:
+        nx.draw_networkx_labels(graph, pos, labels, font_size=10)
+    elif labels:
+        logger.info("Not drawing labels for a graph of more than %s nodes", MAX_LABELS)
+    ax.autoscale_view()
+    ax.set_axis_off()
+
+
+def _draw_edge_measure(graph, pos, labels, cmap, node_color, node_size, vmax, vmin, rasterized=False):
     """
     Typically edge measure has action probabilities.
+
+    Each edge with a positive measure is drawn as a wedge from its source half way to its target, pointing
+    at the target, whose base widens with the measure. A self loop widens the outline of its node instead.
+    The wedges are drawn together as one PolyCollection.
     :param cmap:
     :param graph:
     :param labels:
@@ -27,38 +77,35 @@ def _draw_edge_measure(graph, pos, labels, cmap, node_color, node_size, vmax, vm
     :param pos:
     :param vmax:
     :param vmin:
+    :param rasterized: rasterize the edges and nodes in vector output
     :return:
     """
-    nx.draw_networkx_edges(graph, pos, arrows=False, alpha=0.1, width=1, node_size=node_size)
-    edge_measure = nx.get_edge_attributes(graph, graph.graph['edge_measure'])
-    # nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_measure, edge_color=edge_colors, label_pos=0.1,
-    #                              font_size=8)
-    arrowstyle = ArrowStyle("Wedge, tail_width=0.5, shrink_factor=0.1")
-    # Shorten the edges and set the width according to the measure
-    l_width = []
-    for node in graph.nodes:
-        edges = []
-        e_pos = {node: pos[node]}
-        e_width = []
-        l_w = 0
-        for edge in nx.edges(graph, node):
-            print(edge)
-            (src, tgt) = edge
-            if edge_measure[edge] > 0:
-                print(edge_measure[edge])
-                edges.append(edge)
-                e_pos[tgt] = shorten_edge(pos[src], pos[tgt])
-                e_width.append((edge_measure[edge] * 10))
-
-                if src == tgt:
-                    l_w = (edge_measure[edge] * 10)
-        l_width.append(l_w)
-
-        nx.draw_networkx_edges(graph, e_pos, edges, arrows=True, width=e_width, node_size=50,
-                               arrowstyle=arrowstyle)
+    ax = plt.gca()
+    xy, index = _node_positions(graph, pos)
+    src, tgt = _edge_endpoints(graph, index)
+    measure_name = graph.graph['edge_measure']
+    measure = np.array([d.get(measure_name, 0) for _, _, d in graph.edges(data=True)], dtype=np.float64)
+
+    ax.add_collection(LineCollection(np.stack([xy[src], xy[tgt]], axis=1), colors='#000000', linewidths=1,
+                                     alpha=0.1, rasterized=rasterized))
+    # Shorten the edges and set the width of the wedge base according to the measure
+    shown = (measure > 0) & (src != tgt)
+    base, tip = xy[src[shown]], shorten_edge(xy[src[shown]], xy[tgt[shown]])
+    normal = np.stack([base[:, 1] - tip[:, 1], tip[:, 0] - base[:, 0]], axis=1)
+    half_width = normal * (0.05 + 0.2 * measure[shown])[:, np.newaxis]
+    wedges = np.stack([base + half_width, tip, base - half_width], axis=1)
+    ax.add_collection(PolyCollection(wedges, facecolors='#000000', edgecolors='none', rasterized=rasterized))
+    loops = (measure > 0) & (src == tgt)
+    l_width = np.zeros(len(xy))
+    l_width[src[loops]] = measure[loops] * 10
+
     nx.draw_networkx_nodes(graph, pos, node_size=node_size, vmin=vmin, vmax=vmax, cmap=cmap, edgecolors='#000000',
-                           node_color=node_color, linewidths=l_width)
-    nx.draw_networkx_labels(graph, pos, labels, font_size=10)
+                           node_color=node_color, linewidths=l_width).set_rasterized(rasterized)
+    if labels and graph.number_of_nodes() <= MAX_LABELS:
+        nx.draw_networkx_labels(graph, pos, labels, font_size=10)
+    elif labels:
+        logger.info("Not drawing labels for a graph of more than %s nodes", MAX_LABELS)
+    ax.autoscale_view()
 
 
 def plot_graph(graph: nx.Graph,
@@ -74,8 +121,25 @@ def plot_graph(graph: nx.Graph,
                actions=False,
                arrows=False,
                format='png',
+               fast=None,
+               rasterized=False,
                *args,
                **kwargs) -> None:
+    """
+    Plot a graph laid out by the 'pos' node attribute.
+
+    :param fast: draw all edges as one LineCollection and all nodes as one scatter rather than with
+                 networkx, by default for graphs of more than FAST_RENDER_NODES nodes. Node labels are
+                 drawn only for graphs of up to MAX_LABELS nodes and action labels are not drawn.
+    :param rasterized: rasterize the edges and nodes in vector (pdf, svg) output, which keeps files of
+                       large graphs small
+    """
+    if fast is None:
+        fast = graph.number_of_nodes() > FAST_RENDER_NODES
+    if format == 'svg' and filepath is not None and not rasterized and graph.number_of_nodes() > MAX_SVG_NODES:
+        filepath = Path(filepath).with_suffix('.png')
+        format = 'png'
+        logger.warning("Writing %s instead of an SVG for a graph of more than %s nodes", filepath, MAX_SVG_NODES)
 
     if figsize is None:
         try:
@@ -103,19 +167,23 @@ def plot_graph(graph: nx.Graph,
         nx.draw_networkx_edge_labels(graph, pos, edge_labels=edge_labels)
     else:
         if 'edge_measure' in graph.graph:
-            _draw_edge_measure(graph, pos, labels, cmap, node_color, node_size, vmax, vmin)
+            _draw_edge_measure(graph, pos, labels, cmap, node_color, node_size, vmax, vmin, rasterized)
+        elif fast:
+            _draw_fast(graph, pos, labels, cmap, node_color, node_size, vmax, vmin, rasterized)
         else:
             nx.draw(G=graph, with_labels=with_labels, pos=pos, node_color=node_color, labels=labels,
                     node_size=node_size, label=title, width=1, vmin=vmin, vmax=vmax, cmap=cmap,
                     arrows=arrows, arrowsize=12, *args, **kwargs)
 
-        if 'actions' in graph.graph and actions:
+        if 'actions' in graph.graph and actions and not fast:
             actions = nx.get_edge_attributes(graph, 'action')
             nx.draw_networkx_edge_labels(graph, pos, edge_labels=actions,
                                          label_pos=0.35, font_size=12)
 
     plt.title(title)
-    plt.draw()
+    if not fast:
+        # Saving or showing the figure draws it anyway, which is slow enough to avoid twice for large graphs
+        plt.draw()
     if colorbar:
         _colorbar(colorbar, cmap, vmin, vmax)
 
@@ -124,7 +192,8 @@ def plot_graph(graph: nx.Graph,
     else:
         logger.info("Saving plot to %s", filepath)
         if format == 'svg':
-            plt.savefig(filepath, format=format, dpi=1200)
+            # Rasterized parts would be enormous at the full vector resolution
+            plt.savefig(filepath, format=format, dpi=300 if rasterized else 1200)
         else:
             plt.savefig(filepath, format=format)
     plt.close()
@@ -0,0 +1,37 @@
+import logging
+import time
+
+import numpy as np
+
+from nxempowerment import grid_world
+from nxempowerment.compiled import compile_graph
+from nxempowerment.reachability import reachable_counts
+from nxempowerment.sketch import hyperloglog_counts, hyperloglog_relative_error
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Compare the approximate HyperLogLog reachable counts against the exact counts on the bundled grid worlds
+GRID_WORLDS = [grid_world.GridWorldUnequalRoomsSmall, grid_world.GridWorldUnequalRooms,
+               grid_world.GridWorldSixRoomsSmall, grid_world.GridWorldSixRooms]
+HORIZONS = [3, 10, 20]
+REGISTER_BITS = [6, 8, 10, 12]
+
+print("{:<28} {:>7} {:>4} {:>9} {:>9} {:>9} {:>10} {:>9} {:>9}".format(
+    'grid world', 'steps', 'bits', 'bound', 'mean err', 'max err', 'emp bits', 'exact s', 'hll s'))
+for gw in GRID_WORLDS:
+    compiled = compile_graph(gw().graph_diag())
+    for num_steps in HORIZONS:
+        start = time.time()
+        exact = reachable_counts(compiled, num_steps)
+        exact_time = time.time() - start
+        for register_bits in REGISTER_BITS:
+            start = time.time()
+            estimates = np.rint(hyperloglog_counts(compiled, num_steps, register_bits=register_bits))
+            hll_time = time.time() - start
+            relative = np.abs(estimates - exact) / exact
+            # Error of the empowerment itself, log2 of the count excluding the start node
+            emp_error = np.abs(np.log2(np.maximum(estimates - 1, 1)) - np.log2(np.maximum(exact - 1, 1)))
+            print("{:<28} {:>7} {:>4} {:>9.4f} {:>9.4f} {:>9.4f} {:>10.4f} {:>9.3f} {:>9.3f}".format(
+                gw.__name__, num_steps, register_bits, hyperloglog_relative_error(register_bits),
+                relative.mean(), relative.max(), emp_error.mean(), exact_time, hll_time))
@@ -0,0 +1,82 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment.cache import (EmpowermentCache, cached_graph_node_empowerment,
+                                 cached_graph_node_empowerment_horizons, graph_fingerprint)
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSimple, GridWorldUnequalRooms
+
+
+def test_fingerprint_ignores_insertion_order():
+    gw = GridWorldUnequalRooms().graph()
+    shuffled = nx.DiGraph()
+    shuffled.graph.update(gw.graph)
+    shuffled.add_nodes_from(reversed(list(gw.nodes)))
+    shuffled.add_edges_from(reversed(list(gw.edges(data=True))))
+    assert graph_fingerprint(shuffled) == graph_fingerprint(gw)
+
+    first = next(iter(gw.edges))
+    gw.edges[first]['action'] = 'o'
+    assert graph_fingerprint(shuffled) != graph_fingerprint(gw)
+
+
+def test_cache_hit(tmp_path, monkeypatch):
+    cache = EmpowermentCache(tmp_path)
+    gw = GridWorldUnequalRooms().graph_diag()
+    expected = graph_node_empowerment(gw, 4)
+    assert cached_graph_node_empowerment(gw, 4, cache=cache) == expected
+
+    def fail(*args, **kwargs):
+        raise AssertionError("computed on a cache hit")
+    monkeypatch.setattr('nxempowerment.cache.graph_node_empowerment', fail)
+    assert cached_graph_node_empowerment(gw, 4, cache=cache) == expected
+
+
+def test_lower_horizons_served_from_horizons(tmp_path, monkeypatch):
+    cache = EmpowermentCache(tmp_path)
+    gw = GridWorldUnequalRooms().graph()
+    values, index = cached_graph_node_empowerment_horizons(gw, 6, cache=cache)
+    expected = graph_node_empowerment(gw, 3)
+    monkeypatch.setattr('nxempowerment.cache.graph_node_empowerment', None)
+    monkeypatch.setattr('nxempowerment.cache.graph_node_empowerment_horizons', None)
+    cached, cached_index = cached_graph_node_empowerment_horizons(gw, 4, cache=cache)
+    assert cached_index == index
+    np.testing.assert_array_equal(cached, values[:, :4])
+    emp = cached_graph_node_empowerment(gw, 3, cache=cache)
+    assert emp == {node: values[index[node], 2] for node in gw.nodes}
+    assert emp == expected
+
+
+def test_lru_eviction(tmp_path):
+    gw = GridWorldSimple().graph()
+    cache = EmpowermentCache(tmp_path)
+    cached_graph_node_empowerment(gw, 1, cache=cache)
+    size = cache.size()
+    cache.max_bytes = 2 * size + size // 2
+    cached_graph_node_empowerment(gw, 2, cache=cache)
+    cached_graph_node_empowerment(gw, 3, cache=cache)
+    assert len(list(tmp_path.glob('*.npz'))) == 2
+    assert cache.size() <= cache.max_bytes
+
+
+def test_oversized_entry_kept(tmp_path, caplog):
+    gw = GridWorldSimple().graph()
+    cache = EmpowermentCache(tmp_path)
+    cached_graph_node_empowerment(gw, 1, cache=cache)
+    cache.max_bytes = 1
+    cached_graph_node_empowerment(gw, 2, cache=cache)
+    assert [path.name.split('-', 1)[1] for path in tmp_path.glob('*.npz')] == ['2-2-1.npz']
+    assert 'larger than max_bytes' in caplog.text
+
+
+def test_approximate_not_cached(tmp_path):
+    with pytest.raises(ValueError):
+        cached_graph_node_empowerment(GridWorldSimple().graph(), 2, cache=EmpowermentCache(tmp_path),
+                                      method='hyperloglog')
+
+
+def test_symmetry_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        cached_graph_node_empowerment(GridWorldSimple().graph(), 2, cache=EmpowermentCache(tmp_path),
+                                      symmetry=True)
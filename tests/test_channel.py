@@ -0,0 +1,120 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment import channel, grid_world
+from nxempowerment.channel import blahut_arimoto, graph_channel_empowerment, next_state_table
+from nxempowerment.compiled import compile_graph
+
+
+def _exact_step_counts(table, num_steps):
+    """Number of distinct end states of all action sequences from every node"""
+    reached = [{i} for i in range(len(table))]
+    for _ in range(num_steps):
+        reached = [set(table[list(states)].ravel()) for states in reached]
+    return np.array([len(states) for states in reached])
+
+
+@pytest.mark.parametrize('num_steps', [1, 2, 3])
+def test_deterministic_capacity_is_log_count(num_steps):
+    graph = grid_world.GridWorldSixRoomsSmall().graph()
+    compiled = compile_graph(graph)
+    table, _ = next_state_table(compiled)
+    empowerment = graph_channel_empowerment(compiled, num_steps, tol=1e-9, batch_size=7)
+    expected = np.log2(_exact_step_counts(table, num_steps))
+    np.testing.assert_allclose([empowerment[node] for node in compiled.nodes], expected, atol=1e-6)
+
+
+def test_next_state_table_stays_without_action():
+    graph = nx.DiGraph(actions={'a', 'b'})
+    graph.add_edge(0, 1, action='a')
+    graph.add_edge(1, 0, action='b')
+    table, actions = next_state_table(graph)
+    assert actions == ['a', 'b']
+    np.testing.assert_array_equal(table, [[1, 0], [1, 0]])
+
+
+def test_next_state_table_rejects_ambiguous_actions():
+    graph = nx.DiGraph()
+    graph.add_edge(0, 1, action='a')
+    graph.add_edge(0, 2, action='a')
+    with pytest.raises(ValueError):
+        next_state_table(graph)
+
+
+def test_binary_symmetric_channel():
+    error = 0.1
+    channel = np.array([[[1 - error, error], [error, 1 - error]]])
+    capacity, converged = blahut_arimoto(channel)
+    entropy = -error * np.log2(error) - (1 - error) * np.log2(1 - error)
+    assert converged.all()
+    assert capacity[0] == pytest.approx(1 - entropy, abs=1e-6)
+
+
+def test_slip_lowers_empowerment():
+    graph = grid_world.GridWorldSixRoomsSmall().graph()
+    exact = graph_channel_empowerment(graph, 2)
+    noisy = graph_channel_empowerment(graph, 2, slip=0.3)
+    assert all(noisy[node] <= exact[node] + 1e-6 for node in graph)
+    assert sum(noisy.values()) < sum(exact.values())
+    # Pure noise leaves no choice
+    assert max(graph_channel_empowerment(graph, 2, slip=1.0).values()) == pytest.approx(0, abs=1e-6)
+
+
+def test_memory_budget_splits_batches():
+    graph = grid_world.GridWorldSixRoomsSmall().graph()
+    assert graph_channel_empowerment(graph, 2, max_memory=1) == pytest.approx(graph_channel_empowerment(graph, 2))
+
+
+def test_batches_split_before_composing(monkeypatch):
+    graph = grid_world.GridWorldUnequalRooms().graph()
+    max_memory = 64 * 1024
+    sizes = []
+    compose = channel._sequence_channels
+
+    def recording(table, sources, local, num_steps, slip):
+        channels = compose(table, sources, local, num_steps, slip)
+        sizes.append((len(sources), 4 * channels.nbytes))
+        return channels
+
+    monkeypatch.setattr(channel, '_sequence_channels', recording)
+    graph_channel_empowerment(graph, 3, slip=0.1, max_memory=max_memory)
+    assert all(size <= max_memory for num_sources, size in sizes if num_sources > 1)
+
+
+def test_edge_slip_matches_scalar_slip():
+    compiled = compile_graph(grid_world.GridWorldSixRoomsSmall().graph())
+    table, _ = next_state_table(compiled)
+    sources = np.arange(10)
+    local = channel._local_states(table, sources, 2)
+    scalar = channel._sequence_channels(table, sources, local, 2, 0.2)
+    per_edge = channel._sequence_channels(table, sources, local, 2, np.full(table.shape, 0.2))
+    np.testing.assert_allclose(per_edge, scalar, atol=1e-12)
+
+
+def test_edge_slip_overrides_scalar_slip():
+    graph = grid_world.GridWorldSixRoomsSmall().graph()
+    exact = graph_channel_empowerment(graph, 2)
+    nx.set_edge_attributes(graph, 0.0, 'slip')
+    noisy = graph_channel_empowerment(graph, 2, slip=0.5)
+    # Only the actions without an edge still slip
+    assert all(noisy[node] <= exact[node] + 1e-6 for node in graph)
+    assert sum(noisy.values()) > sum(graph_channel_empowerment(graph, 2, slip=0.5, slip_attribute='noise').values())
+
+
+def test_edge_slip_only_lowers_slippery_nodes():
+    graph = nx.DiGraph(actions={'a', 'b'})
+    graph.add_edge(0, 1, action='a', slip=1.0)
+    graph.add_edge(0, 2, action='b', slip=1.0)
+    graph.add_edge(3, 1, action='a')
+    graph.add_edge(3, 2, action='b')
+    empowerment = graph_channel_empowerment(graph, 1)
+    assert empowerment[0] == pytest.approx(0, abs=1e-6)
+    assert empowerment[3] == pytest.approx(1, abs=1e-6)
+
+
+def test_slip_table_rejects_probabilities_outside_unit_interval():
+    graph = nx.DiGraph()
+    graph.add_edge(0, 1, action='a', slip=1.5)
+    with pytest.raises(ValueError):
+        graph_channel_empowerment(graph, 1)
@@ -0,0 +1,68 @@
+import pickle
+
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment, node_empowerment
+from nxempowerment.grid_world import GridWorldSixRooms, GridWorldSimple
+
+
+def test_compile_grid_world():
+    gw = GridWorldSimple().graph_diag()
+    compiled = compile_graph(gw)
+    assert compiled.number_of_nodes() == gw.number_of_nodes()
+    assert compiled.number_of_edges() == gw.number_of_edges()
+    for i, node in enumerate(compiled.nodes):
+        succ = {compiled.nodes[j] for j in compiled.successors(i)}
+        assert succ == set(gw.successors(node))
+        for e in range(compiled.indptr[i], compiled.indptr[i + 1]):
+            tgt = compiled.nodes[compiled.indices[e]]
+            assert compiled.actions[compiled.action[e]] == gw.edges[node, tgt]['action']
+            assert compiled.distance[e] == gw.edges[node, tgt].get('distance', 1.0)
+
+
+def test_compile_undirected_and_multigraph():
+    compiled = compile_graph(nx.path_graph(3))
+    assert compiled.number_of_edges() == 4
+    assert compiled.action is None and compiled.distance is None
+
+    mg = nx.MultiDiGraph([(0, 1), (0, 1), (1, 2)])
+    nx.set_edge_attributes(mg, 5.0, 'length')
+    compiled = compile_graph(mg, distance='length')
+    assert compiled.number_of_edges() == 3
+    np.testing.assert_array_equal(compiled.distance, [5.0, 5.0, 5.0])
+    assert graph_node_empowerment(compiled, 2) == graph_node_empowerment(mg, 2)
+
+
+def test_compiled_matches_networkx():
+    gw = GridWorldSixRooms().graph_diag()
+    compiled = compile_graph(gw)
+    for num_steps in [1, 3, 12]:
+        assert graph_node_empowerment(compiled, num_steps) == graph_node_empowerment(gw, num_steps)
+    for node in [(0, 0), (8, 4), (30, 23)]:
+        assert node_empowerment(compiled, node, 12) == node_empowerment(gw, node, 12)
+
+
+def test_compiled_pickle():
+    compiled = compile_graph(GridWorldSimple().graph())
+    compiled.frontier_counts(0, 2)
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert restored.index == compiled.index
+    assert graph_node_empowerment(restored, 3) == graph_node_empowerment(compiled, 3)
+
+
+def test_action_table():
+    gw = GridWorldSimple().graph()
+    compiled = compile_graph(gw)
+    table = compiled.action_table
+    assert table.shape == (compiled.number_of_nodes(), len(compiled.actions))
+    stay = compiled.actions.index('o')
+    np.testing.assert_array_equal(table[:, stay], np.arange(compiled.number_of_nodes()))
+    for i, node in enumerate(compiled.nodes):
+        for a, action in enumerate(compiled.actions):
+            following = [v for v in gw.successors(node) if gw.edges[node, v]['action'] == action]
+            if following:
+                assert compiled.nodes[table[i, a]] == following[0]
+            elif action != 'o':
+                assert table[i, a] == -1
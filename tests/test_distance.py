@@ -0,0 +1,39 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.compiled import compile_graph
+from nxempowerment.distance import bounded_dijkstra, distance_reachable_counts, graph_node_distance_empowerment
+from nxempowerment.empowerment import graph_node_empowerment
+
+
+@pytest.mark.parametrize('budget', [1.5, 3, 4.3])
+def test_matches_networkx_dijkstra(budget):
+    graph = grid_world.GridWorldSixRoomsSmall().graph_diag()
+    compiled = compile_graph(graph)
+    counts = distance_reachable_counts(compiled, budget)
+    def weight(u, v, d):
+        return d.get('distance', 1)
+    expected = [len(nx.single_source_dijkstra_path_length(graph, node, cutoff=budget, weight=weight))
+                for node in compiled.nodes]
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_unit_distances_match_hops():
+    graph = grid_world.GridWorldUnequalRooms().graph()
+    assert graph_node_distance_empowerment(graph, 3) == graph_node_empowerment(graph, 3)
+
+
+def test_multi_source():
+    graph = nx.path_graph(10)
+    nx.set_edge_attributes(graph, 2.0, 'length')
+    dist = bounded_dijkstra(graph, [0, 9], 4.5, distance='length')
+    assert dist == {0: 0, 1: 2, 2: 4, 9: 0, 8: 2, 7: 4}
+
+
+def test_negative_distance():
+    graph = nx.DiGraph()
+    graph.add_edge(0, 1, distance=-1)
+    with pytest.raises(ValueError):
+        graph_node_distance_empowerment(graph, 1)
@@ -0,0 +1,90 @@
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.empowerment import graph_node_empowerment, graph_node_empowerment_horizons, node_empowerment
+from nxempowerment.utils import logzero
+
+
+GRID_WORLDS = [grid_world.GridWorldSimple, grid_world.GridWorldLine, grid_world.GridWorldUnequalRoomsSmall,
+               grid_world.GridWorldUnequalRooms, grid_world.GridWorldSixRooms, grid_world.GridWorldSixRoomsSmall]
+
+
+def grid_world_graphs():
+    graphs = [pytest.param(grid_world.GridWorldGraph2Rooms().graph(), id='GridWorldGraph2Rooms')]
+    for gw in GRID_WORLDS:
+        graphs.append(pytest.param(gw().graph(), id=gw.__name__))
+        graphs.append(pytest.param(gw().graph_diag(), id=gw.__name__ + '-diag'))
+    return graphs
+
+
+def _recursive_succ(graph, node, seen, step, max_steps):
+    # The original exhaustive recursive walk, kept as a reference implementation
+    step += 1
+    for n in graph.neighbors(node):
+        seen.add(n)
+        if step < max_steps:
+            _recursive_succ(graph, n, seen, step, max_steps)
+
+
+def recursive_node_empowerment(graph, node, num_steps):
+    successors = {node}
+    _recursive_succ(graph, node, successors, 0, num_steps)
+    return logzero(max(len(successors) - 1, 0))
+
+
+@pytest.mark.parametrize('graph', grid_world_graphs())
+@pytest.mark.parametrize('num_steps', [1, 2, 3, 4])
+def test_frontier_matches_recursive(graph, num_steps):
+    emp = graph_node_empowerment(graph, num_steps)
+    expected = {node: recursive_node_empowerment(graph, node, num_steps) for node in graph.nodes}
+    assert emp == expected
+
+
+def test_node_empowerment_excludes_start_node():
+    gw = grid_world.GridWorldLine().graph()
+    # From the end of the line, the agent can step back onto the start node but that does not count
+    assert node_empowerment(gw, (0, 0), 2) == logzero(2)
+    assert node_empowerment(gw, (0, 0), 10) == logzero(3)
+
+
+def test_node_empowerment_long_horizon():
+    gw = grid_world.GridWorldSixRooms().graph()
+    # Far beyond the recursion limit, every node of the (connected) grid world is reachable
+    assert node_empowerment(gw, (0, 0), 5000) == logzero(gw.number_of_nodes() - 1)
+
+
+@pytest.mark.parametrize('graph', grid_world_graphs())
+@pytest.mark.parametrize('num_steps', [1, 4, 20])
+def test_bitset_matches_frontier(graph, num_steps):
+    assert graph_node_empowerment(graph, num_steps, method='bitset') == graph_node_empowerment(graph, num_steps)
+
+
+def test_bitset_blocks():
+    gw = grid_world.GridWorldSixRooms().graph_diag()
+    # A tiny memory budget forces one 64 node word per block
+    emp = graph_node_empowerment(gw, 6, method='bitset', max_memory=1)
+    assert emp == graph_node_empowerment(gw, 6)
+
+
+@pytest.mark.parametrize('method', ['frontier', 'bitset'])
+def test_graph_node_empowerment_horizons(method):
+    gw = grid_world.GridWorldUnequalRooms().graph_diag()
+    values, index = graph_node_empowerment_horizons(gw, 5, method=method, set_attributes=True)
+    assert values.shape == (gw.number_of_nodes(), 5)
+    for k in range(1, 6):
+        emp = graph_node_empowerment(gw, k)
+        for node, value in emp.items():
+            assert values[index[node], k - 1] == value
+            assert gw.nodes[node]['{}_step_empowerment'.format(k)] == value
+
+
+@pytest.mark.parametrize('method', ['frontier', 'bitset', 'hyperloglog'])
+def test_unknown_keywords_rejected(method):
+    gw = grid_world.GridWorldSimple().graph()
+    with pytest.raises(TypeError):
+        graph_node_empowerment(gw, 3, method=method, worker=8, anything='x')
+
+
+def test_unknown_keywords_rejected_horizons():
+    with pytest.raises(TypeError):
+        graph_node_empowerment_horizons(grid_world.GridWorldSimple().graph(), 3, worker=8)
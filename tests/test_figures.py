@@ -0,0 +1,26 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import networkx as nx
+
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.figures import Scene, plot_empowerment_horizons, plot_graph_measures
+from nxempowerment.grid_world import GridWorldSixRoomsSmall
+
+
+def test_plot_empowerment_horizons(tmp_path):
+    graph = GridWorldSixRoomsSmall().graph()
+    paths = plot_empowerment_horizons(graph, 3, tmp_path, format='pdf', shared_scale=True)
+    assert [p.name for p in paths] == ['{}_step_empowerment.pdf'.format(k) for k in (1, 2, 3)]
+    assert all(p.stat().st_size > 0 for p in paths)
+
+
+def test_plot_graph_measures_in_workers(tmp_path):
+    graph = GridWorldSixRoomsSmall().graph()
+    for k in (1, 2):
+        nx.set_node_attributes(graph, graph_node_empowerment(graph, k), '{}_step'.format(k))
+    scene = Scene(graph)
+    # Opposite edges share a segment
+    assert len(scene.segments) == graph.to_undirected().number_of_edges() - nx.number_of_selfloops(graph)
+    paths = plot_graph_measures(graph, ['1_step', '2_step'], tmp_path, workers=2, scene=scene)
+    assert all(p.exists() for p in paths)
@@ -0,0 +1,86 @@
+import math
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment.compiled import compile_graph
+from nxempowerment.goal_information import goal_distances, graph_node_relevant_goal_information
+from nxempowerment.grid_world import GridWorldSixRoomsSmall, GridWorldUnequalRoomsSmall
+
+
+def _entropy(p):
+    return -sum(x * math.log2(x) for x in p if x > 0)
+
+
+def _reference(graph, node):
+    """Relevant goal information of one node from per goal shortest path lengths"""
+    if 'actions' in graph.graph:
+        # The next node of each action, an action without an edge stays
+        moves = {action: node for action in graph.graph['actions']}
+        moves.update({action: v for _, v, action in graph.out_edges(node, data='action')})
+        actions = list(moves.values())
+    else:
+        edges = list(graph.out_edges(node)) if graph.is_directed() else list(graph.edges(node))
+        actions = [v for _, v in edges]
+    if node not in actions:
+        actions.append(node)
+    goals = nx.single_source_shortest_path_length(graph, node)
+    p = np.zeros(len(actions))
+    policy_entropy = 0
+    for goal in goals:
+        to_goal = nx.single_target_shortest_path_length(graph, goal) if graph.is_directed() else \
+            nx.single_source_shortest_path_length(graph, goal)
+        if goal == node:
+            optimal = [i for i, v in enumerate(actions) if v == node]
+        else:
+            optimal = [i for i, v in enumerate(actions) if v != node and dict(to_goal).get(v) == goals[goal] - 1]
+        p[optimal] += 1 / len(optimal) / len(goals)
+        policy_entropy += math.log2(len(optimal)) / len(goals)
+    return _entropy(p) - policy_entropy
+
+
+@pytest.mark.parametrize('gw', [GridWorldUnequalRoomsSmall, GridWorldSixRoomsSmall], ids=lambda gw: gw.__name__)
+@pytest.mark.parametrize('labelled', [True, False])
+def test_matches_reference(gw, labelled):
+    graph = gw().graph_diag()
+    if not labelled:
+        # Without action labels the outgoing edges are the actions
+        graph = nx.DiGraph(graph.edges)
+    information = graph_node_relevant_goal_information(graph, max_memory=50000)
+    for node in list(graph)[::7]:
+        assert information[node] == pytest.approx(_reference(graph, node), abs=1e-9)
+
+
+def test_path():
+    information = graph_node_relevant_goal_information(nx.path_graph(3))
+    assert information[1] == pytest.approx(math.log2(3))
+    assert information[0] == pytest.approx(_entropy([1 / 3, 2 / 3]))
+
+
+def test_self_loops_are_stay_actions():
+    graph = nx.path_graph(3, create_using=nx.DiGraph)
+    graph.add_edge(2, 1)
+    graph.add_edge(1, 1)
+    with_loop = graph_node_relevant_goal_information(graph)
+    graph.remove_edge(1, 1)
+    assert with_loop == pytest.approx(graph_node_relevant_goal_information(graph))
+
+
+def test_goal_distances():
+    graph = nx.gnp_random_graph(60, 0.05, seed=2, directed=True)
+    compiled = compile_graph(graph)
+    goals = np.array([0, 5, 17])
+    distances = goal_distances(compiled, goals)
+    for j, goal in enumerate(goals):
+        lengths = nx.single_target_shortest_path_length(graph, compiled.nodes[goal])
+        expected = np.full(compiled.number_of_nodes(), -1)
+        for node, length in dict(lengths).items():
+            expected[compiled.index[node]] = length
+        np.testing.assert_array_equal(distances[:, j], expected)
+
+
+@pytest.mark.parametrize('num_nodes', [0, 3])
+def test_edgeless_graph(num_nodes):
+    graph = nx.empty_graph(num_nodes, create_using=nx.DiGraph)
+    assert graph_node_relevant_goal_information(graph) == {node: 0.0 for node in graph}
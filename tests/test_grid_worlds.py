@@ -1,7 +1,12 @@
+import math
+
+import networkx as nx
 import numpy as np
+import pytest
 
 from nxempowerment.empowerment import graph_node_empowerment
-from nxempowerment.grid_world import GridWorldSimple
+from nxempowerment.grid_world import (GridWorldSimple, GridWorldSixRooms, GridWorldUnequalRooms,
+                                      generate_grid_world)
 
 
 def test_simple_grid_world_1_step():
@@ -30,3 +35,68 @@ def test_simple_grid_world_2_steps():
     emp = graph_node_empowerment(gw, 2)
     expected = {(0,0): 1, (0,1): 2, (0,2): 2.585, (1,2): 2, (0,3): 2.585, (1,3): 2, (0,4): 1.585}
     np.testing.assert_allclose(list(emp.values()), list(expected.values()), rtol=1E03)
+
+
+def _cellwise_grid_world(_map, diagonals=False, euclidean_dist=True):
+    # Reference construction adding one cell at a time, as grid worlds were originally built
+    graph = nx.empty_graph(0, create_using=nx.DiGraph())
+    for y, row in enumerate(_map):
+        for x, cell in enumerate(row):
+            if int(cell) != 1:
+                continue
+            node = (x, y)
+            graph.add_node(node, pos=node)
+            if (x - 1, y) in graph:
+                graph.add_edge((x - 1, y), node, action='E')
+                graph.add_edge(node, (x - 1, y), action='W')
+            if (x, y - 1) in graph:
+                graph.add_edge((x, y - 1), node, action='N')
+                graph.add_edge(node, (x, y - 1), action='S')
+            if diagonals:
+                dist = math.sqrt(2) if euclidean_dist else 1
+                if (x - 1, y - 1) in graph:
+                    graph.add_edge(node, (x - 1, y - 1), action='SW', distance=dist)
+                    graph.add_edge((x - 1, y - 1), node, action='NE', distance=dist)
+                if (x + 1, y - 1) in graph:
+                    graph.add_edge(node, (x + 1, y - 1), action='SE', distance=dist)
+                    graph.add_edge((x + 1, y - 1), node, action='NW', distance=dist)
+    return graph
+
+
+@pytest.mark.parametrize('gw', [GridWorldSimple, GridWorldSixRooms, GridWorldUnequalRooms])
+@pytest.mark.parametrize('diagonals', [False, True])
+@pytest.mark.parametrize('euclidean_dist', [False, True])
+def test_generate_grid_world_matches_cellwise(gw, diagonals, euclidean_dist):
+    graph = generate_grid_world(gw._map, diagonals, euclidean_dist=euclidean_dist)
+    expected = _cellwise_grid_world(gw._map, diagonals, euclidean_dist)
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert {(u, v): d for u, v, d in graph.edges(data=True)} == {(u, v): d for u, v, d in expected.edges(data=True)}
+
+
+def test_generate_grid_world_ragged_rows():
+    graph = generate_grid_world([[1, 1, 1], [1], [1, 1]])
+    assert graph.number_of_nodes() == 6
+    assert graph.edges[(0, 1), (0, 2)]['action'] == 'N'
+
+
+def test_randomise_actions():
+    graph = GridWorldSixRooms().graph_diag()
+    randomised = GridWorldSixRooms(randomise_actions=True, seed=7).graph_diag()
+    assert set(randomised.edges) == set(graph.edges)
+    changed = 0
+    for node in graph.nodes:
+        actions = sorted(d['action'] for _, _, d in graph.edges(node, data=True))
+        assert sorted(d['action'] for _, _, d in randomised.edges(node, data=True)) == actions
+        changed += any(randomised.edges[e]['action'] != graph.edges[e]['action'] for e in graph.edges(node))
+    assert changed > graph.number_of_nodes() / 2
+    again = GridWorldSixRooms(randomise_actions=True, seed=7).graph_diag()
+    assert nx.get_edge_attributes(again, 'action') == nx.get_edge_attributes(randomised, 'action')
+
+
+def test_randomise_actions_keeps_distances():
+    graph = GridWorldSixRooms(randomise_actions=True, seed=3).graph_diag()
+    for (x0, y0), (x1, y1), d in graph.edges(data=True):
+        if x0 != x1 and y0 != y1:
+            assert d['distance'] == pytest.approx(math.sqrt(2))
+        else:
+            assert 'distance' not in d
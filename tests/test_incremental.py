@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRoomsSmall
+from nxempowerment.incremental import affected_nodes, update_graph_node_empowerment
+
+
+@pytest.mark.parametrize('num_steps', [1, 3, 6])
+def test_update_matches_recompute(num_steps):
+    rng = random.Random(1)
+    graph = GridWorldSixRoomsSmall().graph()
+    emp = graph_node_empowerment(graph, num_steps)
+    for _ in range(5):
+        removed = rng.sample(list(graph.edges), 3)
+        graph.remove_edges_from(removed)
+        nodes = list(graph.nodes)
+        added = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(2)] + [((100, 100), nodes[0])]
+        graph.add_edges_from(added)
+        emp = update_graph_node_empowerment(graph, emp, num_steps, added_edges=added, removed_edges=removed)
+        assert emp == graph_node_empowerment(graph, num_steps)
+
+
+def test_update_removed_node():
+    graph = GridWorldSixRoomsSmall().graph()
+    emp = graph_node_empowerment(graph, 4)
+    removed = list(graph.in_edges((3, 3))) + list(graph.out_edges((3, 3)))
+    graph.remove_node((3, 3))
+    emp = update_graph_node_empowerment(graph, emp, 4, removed_edges=removed)
+    assert emp == graph_node_empowerment(graph, 4)
+
+
+def test_update_isolated_nodes():
+    graph = GridWorldSixRoomsSmall().graph()
+    graph.add_node('isolated')
+    emp = graph_node_empowerment(graph, 3)
+    graph.remove_node('isolated')
+    emp = update_graph_node_empowerment(graph, emp, 3, removed_nodes=['isolated'])
+    assert emp == graph_node_empowerment(graph, 3)
+    graph.add_node('added')
+    emp = update_graph_node_empowerment(graph, emp, 3, added_nodes=['added'])
+    assert emp == graph_node_empowerment(graph, 3)
+
+
+def test_affected_nodes_are_local():
+    graph = GridWorldSixRoomsSmall().graph()
+    affected = affected_nodes(graph, [(0, 0)], 3)
+    assert affected == {(0, 0), (1, 0), (0, 1), (2, 0), (1, 1), (0, 2)}
@@ -0,0 +1,44 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRooms
+from nxempowerment.instrumentation import EmpowermentStats
+
+
+def test_stats_and_progress():
+    graph = GridWorldSixRooms().graph_diag()
+    stats = EmpowermentStats()
+    calls = []
+    empowerment = graph_node_empowerment(graph, 4, stats=stats, progress=lambda *args: calls.append(args))
+    assert empowerment == graph_node_empowerment(graph, 4)
+    assert set(stats.phases) == {'compile', 'search', 'write_back'}
+    assert len(stats.nodes_expanded) == graph.number_of_nodes()
+    # The last progress call reports completion
+    assert calls[-1][:2] == (graph.number_of_nodes(), graph.number_of_nodes())
+    summary = stats.summary()
+    assert summary['edges_traversed'] >= summary['nodes_expanded'] > 0
+
+
+def test_counters_on_a_path():
+    compiled = compile_graph(nx.path_graph(10, create_using=nx.DiGraph))
+    counts, expanded, traversed, peak = compiled.frontier_counts_instrumented(0, 3)
+    np.testing.assert_array_equal(counts, compiled.frontier_counts(0, 3))
+    assert (expanded, traversed, peak) == (3, 3, 1)
+    # A vectorized search of a wide star
+    star = compile_graph(nx.star_graph(200).to_directed())
+    counts, expanded, traversed, peak = star.frontier_counts_instrumented(0, 2)
+    np.testing.assert_array_equal(counts, star.frontier_counts(0, 2))
+    assert (expanded, traversed, peak) == (201, 400, 200)
+
+
+def test_stats_phases_for_other_methods():
+    graph = GridWorldSixRooms().graph()
+    stats = EmpowermentStats()
+    graph_node_empowerment(graph, 3, method='bitset', stats=stats)
+    assert set(stats.phases) == {'compile', 'search', 'write_back'}
+    assert stats.nodes_expanded is None
+    with pytest.raises(ValueError):
+        graph_node_empowerment(graph, 3, method='bitset', progress=print)
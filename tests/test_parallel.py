@@ -0,0 +1,26 @@
+import networkx as nx
+import numpy as np
+
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment, graph_node_empowerment_horizons
+from nxempowerment.grid_world import GridWorldSixRooms
+from nxempowerment.parallel import chunk_sources
+
+
+def test_chunk_sources_cover_all_nodes():
+    # A directed star has one hub with a large search cost
+    compiled = compile_graph(nx.DiGraph([(0, leaf) for leaf in range(1, 201)]))
+    chunks = chunk_sources(compiled, 8)
+    assert chunks[0][0] == 0 and chunks[-1][1] == compiled.number_of_nodes()
+    assert all(end == start for (_, end), (start, _) in zip(chunks[:-1], chunks[1:]))
+    # The hub gets a chunk of its own
+    assert chunks[0] == (0, 1)
+
+
+def test_parallel_matches_serial():
+    compiled = compile_graph(GridWorldSixRooms().graph_diag())
+    expected = graph_node_empowerment(compiled, 5)
+    assert graph_node_empowerment(compiled, 5, workers=1) == expected
+    assert graph_node_empowerment(compiled, 5, workers=3) == expected
+    values, _ = graph_node_empowerment_horizons(compiled, 5, workers=2)
+    np.testing.assert_array_equal(values, graph_node_empowerment_horizons(compiled, 5)[0])
@@ -0,0 +1,44 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.query import SpatialIndex, bbox_node_empowerment, halo, query_node_empowerment
+
+
+@pytest.mark.parametrize('num_steps', [1, 4])
+def test_query_matches_whole_graph(num_steps):
+    graph = grid_world.GridWorldSixRooms().graph_diag()
+    expected = graph_node_empowerment(graph, num_steps)
+    nodes = list(graph)[::17]
+    assert query_node_empowerment(graph, nodes, num_steps) == {node: expected[node] for node in nodes}
+    assert query_node_empowerment(compile_graph(graph), nodes, num_steps) == {node: expected[node] for node in nodes}
+
+
+def test_halo_is_bounded():
+    graph = nx.path_graph(100, create_using=nx.DiGraph)
+    assert halo(graph, [10, 50], 3) == {10, 11, 12, 13, 50, 51, 52, 53}
+
+
+@pytest.mark.parametrize('cell_size', [None, 0.3, 7])
+def test_spatial_index(cell_size):
+    rng = np.random.default_rng(0)
+    graph = nx.random_geometric_graph(500, 0.05, seed=1)
+    index = SpatialIndex(graph, cell_size=cell_size)
+    for _ in range(20):
+        x0, y0 = rng.uniform(-0.2, 1, 2)
+        bbox = (x0, y0, x0 + rng.uniform(0, 0.5), y0 + rng.uniform(0, 0.5))
+        expected = {n for n, (x, y) in graph.nodes(data='pos')
+                    if bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]}
+        assert set(index.query(bbox)) == expected
+
+
+def test_bbox_node_empowerment():
+    graph = grid_world.GridWorldUnequalRooms().graph()
+    empowerment = bbox_node_empowerment(graph, (2, 2, 6, 5), 3)
+    expected = graph_node_empowerment(graph, 3)
+    assert empowerment
+    assert all(2 <= x <= 6 and 2 <= y <= 5 for x, y in empowerment)
+    assert empowerment == {node: expected[node] for node in empowerment}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import generate_grid_world
+from nxempowerment.raster import DEFAULT_MAX_MEMORY, grid_empowerment, grid_empowerment_dict, grid_reachable_counts
+
+GRID_WORLDS = [grid_world.GridWorldSimple, grid_world.GridWorldLine, grid_world.GridWorldUnequalRoomsSmall,
+               grid_world.GridWorldUnequalRooms, grid_world.GridWorldSixRooms, grid_world.GridWorldSixRoomsSmall]
+
+
+@pytest.mark.parametrize('gw', GRID_WORLDS, ids=lambda gw: gw.__name__)
+@pytest.mark.parametrize('diagonals', [False, True])
+@pytest.mark.parametrize('num_steps', [1, 3, 7])
+def test_grid_matches_graph(gw, diagonals, num_steps):
+    expected = graph_node_empowerment(generate_grid_world(gw._map, diagonals), num_steps)
+    emp = grid_empowerment_dict(gw._map, num_steps, diagonals)
+    assert emp.keys() == expected.keys()
+    for node, value in expected.items():
+        assert emp[node] == value
+
+
+@pytest.mark.parametrize('diagonals', [False, True])
+def test_grid_tiles_and_open_space(diagonals):
+    # A large room with a few walls, computed in many small tiles
+    _map = np.ones((60, 70), dtype=int)
+    _map[20, 5:50] = 0
+    _map[30:55, 40] = 0
+    expected = graph_node_empowerment(generate_grid_world(_map.tolist(), diagonals), 5)
+    counts = grid_reachable_counts(_map, 5, diagonals, max_memory=64 * 1024)
+    np.testing.assert_array_equal(counts, grid_reachable_counts(_map, 5, diagonals))
+    emp = grid_empowerment(_map, 5, diagonals)
+    assert np.isnan(emp[20, 5])
+    for (x, y), value in expected.items():
+        assert emp[y, x] == value
+
+
+@pytest.mark.parametrize('diagonals', [False, True])
+@pytest.mark.parametrize('max_memory', [1, DEFAULT_MAX_MEMORY])
+def test_grid_bounded_searches(diagonals, max_memory):
+    # Tiles that fit in one byte, or a horizon whose bitsets need a tile smaller than its halo
+    gw = grid_world.GridWorldSixRooms
+    num_steps = 5 if max_memory == 1 else 120
+    expected = graph_node_empowerment(generate_grid_world(gw._map, diagonals), num_steps)
+    emp = grid_empowerment_dict(gw._map, num_steps, diagonals, max_memory=max_memory)
+    assert emp == expected
+
+
+def test_grid_ragged_map():
+    _map = [[1, 1, 1], [1], [1, 1]]
+    empowerment = grid_empowerment_dict(_map, 2)
+    graph = generate_grid_world(_map)
+    assert empowerment == pytest.approx(graph_node_empowerment(graph, 2))
+    assert np.isnan(grid_empowerment(_map, 2)[1, 1:]).all()
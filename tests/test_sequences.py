@@ -0,0 +1,52 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.compiled import compile_graph
+from nxempowerment.sequences import action_sequences, apply_action_sequences, sequence_end_counts
+
+
+def _walk(graph, node, sequence, stay_on_missing):
+    for action in sequence:
+        following = [v for v in graph.successors(node) if graph.edges[node, v]['action'] == action]
+        if following:
+            node = following[0]
+        elif action == 'o' or stay_on_missing:
+            continue
+        else:
+            return None
+    return node
+
+
+@pytest.mark.parametrize('stay_on_missing', [False, True])
+def test_apply_matches_walk(stay_on_missing):
+    graph = grid_world.GridWorldSimple().graph_diag()
+    compiled = compile_graph(graph)
+    num_steps = 2
+    ends = apply_action_sequences(compiled, num_steps, stay_on_missing=stay_on_missing)
+    sequences = action_sequences(len(compiled.actions), num_steps)
+    for i, node in enumerate(compiled.nodes):
+        for s, sequence in enumerate(sequences):
+            expected = _walk(graph, node, [compiled.actions[a] for a in sequence], stay_on_missing)
+            assert ends[i, s] == (-1 if expected is None else compiled.index[expected])
+
+
+def test_action_sequences_order():
+    expected = list(itertools.product(range(3), repeat=2))
+    np.testing.assert_array_equal(action_sequences(3, 2), expected)
+
+
+def test_sequence_end_counts():
+    compiled = compile_graph(grid_world.GridWorldSixRoomsSmall().graph())
+    num_steps = 3
+    starts, ends, counts = sequence_end_counts(compiled, num_steps, stay_on_missing=True, max_memory=4096)
+    # Every sequence ends somewhere
+    totals = np.bincount(starts, weights=counts, minlength=compiled.number_of_nodes())
+    np.testing.assert_array_equal(totals, len(compiled.actions) ** num_steps)
+    reached = apply_action_sequences(compiled, num_steps, stay_on_missing=True)
+    np.testing.assert_array_equal(np.bincount(starts), [len(np.unique(row)) for row in reached])
+    # Without staying in place only valid sequences are counted
+    starts, _, counts = sequence_end_counts(compiled, num_steps)
+    assert counts.sum() < totals.sum()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import pytest
+
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRoomsSmall
+from nxempowerment.service import EmpowermentService, _load_graph
+
+
+async def _get(path: str, target: str):
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n\r\n'.format(target).encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.fixture
+def graph():
+    return GridWorldSixRoomsSmall().graph()
+
+
+def test_service(graph, tmp_path):
+    socket_path = str(tmp_path / 'empowerment.sock')
+    expected = graph_node_empowerment(graph, 3)
+
+    async def scenario():
+        service = EmpowermentService({'six_rooms': graph}, workers=1)
+        server = await service.start(path=socket_path)
+        try:
+            async with server:
+                # Concurrent requests for the same graph and horizon share one computation
+                responses = await asyncio.gather(*[_get(socket_path, '/empowerment?graph=six_rooms&steps=3')
+                                                   for _ in range(5)])
+                assert service.computations == 1
+                for status, body in responses:
+                    assert status == 200
+                    assert {tuple(node): value for node, value in body['empowerment']} == expected
+
+                status, body = await _get(socket_path, '/empowerment?graph=six_rooms&steps=2&node=[1,1]&node=[3,2]')
+                assert status == 200
+                assert body['empowerment'] == [[[1, 1], graph_node_empowerment(graph, 2)[(1, 1)]],
+                                               [[3, 2], graph_node_empowerment(graph, 2)[(3, 2)]]]
+                # Small queries do not compute the whole graph
+                assert service.computations == 1
+
+                status, body = await _get(socket_path, '/empowerment?graph=six_rooms&steps=3&bbox=0,0,3,3')
+                assert status == 200
+                assert all(expected[tuple(node)] == value for node, value in body['empowerment'])
+                assert len(body['empowerment']) == sum(1 for x, y in graph if x <= 3 and y <= 3)
+
+                assert (await _get(socket_path, '/graphs'))[1]['six_rooms']['nodes'] == graph.number_of_nodes()
+                assert (await _get(socket_path, '/empowerment?graph=missing&steps=3'))[0] == 404
+                assert (await _get(socket_path, '/empowerment?graph=six_rooms&steps=x'))[0] == 400
+                assert (await _get(socket_path, '/empowerment?graph=six_rooms&steps=3&node=[99,99]'))[0] == 404
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_graphml_nodes_and_coordinates(tmp_path):
+    # Street networks saved by OSMnx have numeric ids, read back as strings, and 'x', 'y' coordinates
+    streets = nx.path_graph(5, create_using=nx.DiGraph)
+    streets = nx.relabel_nodes(streets, {i: 100 + i for i in streets})
+    for node in streets:
+        streets.nodes[node].update(x=float(node - 100), y=0.0)
+    path = tmp_path / 'streets.graphml'
+    nx.write_graphml(streets, str(path))
+    graph = _load_graph(str(path))
+    expected = graph_node_empowerment(graph, 2)
+
+    async def scenario():
+        service = EmpowermentService({'streets': graph}, workers=1)
+        try:
+            body = await service.handle_query('/empowerment?graph=streets&steps=2&node=101&node="102"')
+            assert body['empowerment'] == [['101', expected['101']], ['102', expected['102']]]
+            body = await service.handle_query('/empowerment?graph=streets&steps=2&bbox=0,-1,2,1')
+            assert body['empowerment'] == [[node, expected[node]] for node in ['100', '101', '102']]
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_replaced_graph(graph):
+    async def scenario():
+        service = EmpowermentService({'g': nx.path_graph(3)}, workers=1)
+        try:
+            await service.handle_query('/empowerment?graph=g&steps=2')
+            service.add_graph('g', graph)
+            body = await service.handle_query('/empowerment?graph=g&steps=2')
+            assert {tuple(node): value for node, value in body['empowerment']} == graph_node_empowerment(graph, 2)
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_graph_replaced_during_computation(graph):
+    async def scenario():
+        service = EmpowermentService({'g': nx.path_graph(3)}, workers=1)
+        try:
+            old = asyncio.ensure_future(service.handle_query('/empowerment?graph=g&steps=2'))
+            # Let the request start its computation of the old graph before replacing it
+            await asyncio.sleep(0)
+            assert service.pending
+            service.add_graph('g', graph)
+            body = await service.handle_query('/empowerment?graph=g&steps=2')
+            assert {tuple(node): value for node, value in body['empowerment']} == graph_node_empowerment(graph, 2)
+            assert len((await old)['empowerment']) == 3
+            body = await service.handle_query('/empowerment?graph=g&steps=2')
+            assert len(body['empowerment']) == graph.number_of_nodes()
+        finally:
+            service.close()
+
+    asyncio.run(scenario())
+
+
+def test_thread_pool_rejected(graph):
+    with ThreadPoolExecutor() as executor:
+        with pytest.raises(ValueError):
+            EmpowermentService({'g': graph}, executor=executor)
+
+
+def test_inexact_method_rejected(graph):
+    with pytest.raises(ValueError):
+        EmpowermentService({'g': graph}, method='hyperloglog')
@@ -0,0 +1,28 @@
+import networkx as nx
+import numpy as np
+
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRooms
+from nxempowerment.reachability import reachable_counts
+from nxempowerment.sketch import hyperloglog_counts, hyperloglog_relative_error
+
+
+def test_hyperloglog_within_error_bound():
+    gw = GridWorldSixRooms().graph()
+    exact = reachable_counts(gw, 10)
+    estimates = hyperloglog_counts(gw, 10, register_bits=10)
+    relative = np.abs(estimates - exact) / exact
+    # Within 3 standard errors for all but a handful of nodes
+    assert np.mean(relative > 3 * hyperloglog_relative_error(10)) < 0.01
+
+
+def test_hyperloglog_small_sets_exact():
+    # Linear counting is essentially exact for sets much smaller than the number of registers
+    graph = nx.path_graph(20, create_using=nx.DiGraph)
+    assert graph_node_empowerment(graph, 3, method='hyperloglog') == graph_node_empowerment(graph, 3)
+
+
+def test_hyperloglog_blocks():
+    gw = GridWorldSixRooms().graph_diag()
+    np.testing.assert_array_equal(hyperloglog_counts(gw, 5, register_bits=6, max_memory=1),
+                                  hyperloglog_counts(gw, 5, register_bits=6))
@@ -0,0 +1,104 @@
+import csv
+
+import numpy as np
+import pytest
+
+from nxempowerment import streaming
+from nxempowerment.compiled import compile_graph
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRoomsSmall
+from nxempowerment.streaming import iter_graph_node_empowerment, write_graph_node_empowerment
+
+
+@pytest.fixture
+def compiled():
+    return compile_graph(GridWorldSixRoomsSmall().graph())
+
+
+def test_iter_chunks(compiled):
+    expected = graph_node_empowerment(compiled, 4)
+    chunks = list(iter_graph_node_empowerment(compiled, 4, chunk_size=50))
+    assert [len(ids) for ids, _ in chunks[:-1]] == [50] * (len(chunks) - 1)
+    ids = np.concatenate([ids for ids, _ in chunks])
+    np.testing.assert_array_equal(ids, np.arange(compiled.number_of_nodes()))
+    values = np.concatenate([values for _, values in chunks])
+    assert dict(zip(compiled.nodes, values.tolist())) == expected
+
+
+def _interrupt_after(monkeypatch, num_chunks):
+    original = streaming.iter_graph_node_empowerment
+
+    def interrupted(*args, **kwargs):
+        for i, chunk in enumerate(original(*args, **kwargs)):
+            if i == num_chunks:
+                raise KeyboardInterrupt
+            yield chunk
+    monkeypatch.setattr(streaming, 'iter_graph_node_empowerment', interrupted)
+
+
+@pytest.mark.parametrize('format', ['npy', 'csv'])
+def test_write_resume(compiled, tmp_path, monkeypatch, format):
+    path = tmp_path / 'emp.{}'.format(format)
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(KeyboardInterrupt):
+            write_graph_node_empowerment(compiled, 3, path, chunk_size=40)
+
+    calls = []
+    original = streaming.iter_graph_node_empowerment
+    monkeypatch.setattr(streaming, 'iter_graph_node_empowerment',
+                        lambda *args: calls.append(args[3]) or original(*args))
+    write_graph_node_empowerment(compiled, 3, path, chunk_size=40)
+    # Resumed after the two completed chunks
+    assert calls == [80]
+
+    expected = graph_node_empowerment(compiled, 3)
+    if format == 'npy':
+        values = np.load(path)
+    else:
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))[1:]
+        assert [int(row[0]) for row in rows] == list(range(compiled.number_of_nodes()))
+        values = [float(row[2]) for row in rows]
+    assert dict(zip(compiled.nodes, values)) == pytest.approx(expected)
+
+
+def test_write_parquet(compiled, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = write_graph_node_empowerment(compiled, 3, tmp_path / 'emp.parquet', chunk_size=100)
+    table = pq.read_table(path)
+    assert table.num_rows == compiled.number_of_nodes()
+
+
+@pytest.mark.parametrize('change', ['graph', 'chunk_size'])
+def test_write_restarts_for_other_run(compiled, tmp_path, monkeypatch, change):
+    path = tmp_path / 'emp.npy'
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 2)
+        with pytest.raises(KeyboardInterrupt):
+            write_graph_node_empowerment(compiled, 3, path, chunk_size=40)
+
+    chunk_size = 40
+    if change == 'graph':
+        # Same number of nodes, one edge fewer
+        graph = GridWorldSixRoomsSmall().graph()
+        graph.remove_edge(*next(iter(graph.edges)))
+        compiled = compile_graph(graph)
+    else:
+        chunk_size = 30
+    calls = []
+    original = streaming.iter_graph_node_empowerment
+    monkeypatch.setattr(streaming, 'iter_graph_node_empowerment',
+                        lambda *args: calls.append(args[3]) or original(*args))
+    write_graph_node_empowerment(compiled, 3, path, chunk_size=chunk_size)
+    assert calls == [0]
+    assert dict(zip(compiled.nodes, np.load(path).tolist())) == graph_node_empowerment(compiled, 3)
+
+
+def test_write_parquet_replaces_parts(compiled, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'emp.parquet'
+    write_graph_node_empowerment(compiled, 3, path, chunk_size=50)
+    write_graph_node_empowerment(compiled, 3, path, chunk_size=100, resume=False)
+    assert len(list(path.glob('part-*.parquet'))) == -(-compiled.number_of_nodes() // 100)
+    assert pq.read_table(path).num_rows == compiled.number_of_nodes()
@@ -0,0 +1,57 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from nxempowerment import grid_world
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import generate_grid_world
+from nxempowerment.reachability import reachable_counts
+from nxempowerment.symmetry import neighbourhood_classes, symmetric_reachable_counts
+
+GRID_WORLDS = [grid_world.GridWorldUnequalRooms, grid_world.GridWorldSixRooms, grid_world.GridWorldSixRoomsSmall]
+
+
+@pytest.mark.parametrize('gw', GRID_WORLDS, ids=lambda gw: gw.__name__)
+@pytest.mark.parametrize('diagonal', [False, True], ids=['graph', 'graph_diag'])
+@pytest.mark.parametrize('num_steps', [1, 2, 3, 6])
+def test_symmetry_matches_exact(gw, diagonal, num_steps):
+    graph = gw().graph_diag() if diagonal else gw().graph()
+    assert graph_node_empowerment(graph, num_steps, symmetry=True) == graph_node_empowerment(graph, num_steps)
+
+
+def test_large_grid_hit_rate():
+    graph = generate_grid_world([[1] * 60 for _ in range(60)])
+    counts, hit_rate = symmetric_reachable_counts(graph, 4)
+    np.testing.assert_array_equal(counts, reachable_counts(graph, 4))
+    assert hit_rate > 0.9
+
+
+@pytest.mark.parametrize('gw', GRID_WORLDS[1:], ids=lambda gw: gw.__name__)
+def test_grid_world_hit_rate(gw):
+    graph = gw().graph()
+    counts, hit_rate = symmetric_reachable_counts(graph, 2)
+    np.testing.assert_array_equal(counts, reachable_counts(graph, 2))
+    assert hit_rate > 0.5
+
+
+def test_short_cycles_split_classes():
+    # The corner of a grid lies on one square, the middle of an edge on two
+    graph = nx.DiGraph(nx.grid_2d_graph(3, 3))
+    labels = neighbourhood_classes(graph, 1)
+    index = {node: i for i, node in enumerate(graph)}
+    assert labels[index[(0, 0)]] != labels[index[(0, 1)]]
+
+
+def test_verify_splits_asymmetric_classes():
+    # Every node of both cycles has one successor, colour refinement cannot tell them apart
+    graph = nx.disjoint_union(nx.cycle_graph(3, create_using=nx.DiGraph), nx.cycle_graph(8, create_using=nx.DiGraph))
+    assert len(np.unique(neighbourhood_classes(graph, 5))) == 1
+    counts, _ = symmetric_reachable_counts(graph, 5)
+    np.testing.assert_array_equal(counts, reachable_counts(graph, 5))
+
+
+def test_verify_samples_inside_class():
+    # The first and last member of the class are both on a 3-cycle, the 8-cycle sits between them
+    graph = nx.disjoint_union_all([nx.cycle_graph(n, create_using=nx.DiGraph) for n in (3, 8, 3)])
+    counts, _ = symmetric_reachable_counts(graph, 5)
+    np.testing.assert_array_equal(counts, reachable_counts(graph, 5))
@@ -0,0 +1,67 @@
+import logging
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import pytest
+
+from matplotlib.collections import PolyCollection
+
+from nxempowerment import visualize
+from nxempowerment.empowerment import graph_node_empowerment
+from nxempowerment.grid_world import GridWorldSixRoomsSmall, GridWorldSimple
+from nxempowerment.visualize import plot_graph_with_measure
+
+
+@pytest.fixture
+def graph():
+    gw = GridWorldSixRoomsSmall().graph()
+    nx.set_node_attributes(gw, graph_node_empowerment(gw, 2), '2_step_empowerment')
+    return gw
+
+
+@pytest.mark.parametrize('fast', [False, True])
+@pytest.mark.parametrize('format', ['png', 'pdf'])
+def test_plot_graph_with_measure(graph, tmp_path, fast, format):
+    path = tmp_path / 'plot.{}'.format(format)
+    plot_graph_with_measure(graph, '2_step_empowerment', path, node_names=False, format=format, fast=fast,
+                            rasterized=fast)
+    assert path.stat().st_size > 0
+
+
+def test_huge_svg_falls_back_to_png(graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(visualize, 'MAX_SVG_NODES', 10)
+    plot_graph_with_measure(graph, '2_step_empowerment', tmp_path / 'plot.svg', format='svg')
+    assert (tmp_path / 'plot.png').exists()
+    assert not (tmp_path / 'plot.svg').exists()
+
+
+def test_edge_measure_is_quiet(tmp_path, capsys):
+    gw = GridWorldSimple().graph()
+    gw.graph['edge_measure'] = 'probability'
+    for u, v in gw.edges:
+        gw.edges[u, v]['probability'] = 0.5
+    nx.set_node_attributes(gw, graph_node_empowerment(gw, 1), 'empowerment')
+    plot_graph_with_measure(gw, 'empowerment', tmp_path / 'plot.png')
+    assert (tmp_path / 'plot.png').exists()
+    assert capsys.readouterr().out == ''
+
+
+def test_edge_measure_wedges(monkeypatch, caplog):
+    gw = GridWorldSimple().graph()
+    gw.graph['edge_measure'] = 'probability'
+    for u, v in gw.edges:
+        gw.edges[u, v]['probability'] = 0.5 if u != v else 0.0
+    monkeypatch.setattr(visualize, 'MAX_LABELS', 1)
+    plt.figure()
+    with caplog.at_level(logging.INFO, logger='nxempowerment.visualize'):
+        visualize._draw_edge_measure(gw, nx.get_node_attributes(gw, 'pos'), {node: str(node) for node in gw},
+                                     plt.cm.coolwarm, None, 300, None, None)
+    wedges = [c for c in plt.gca().collections if isinstance(c, PolyCollection)]
+    plt.close()
+    # One wedge per edge that is not a self loop, drawn together
+    assert len(wedges) == 1
+    assert len(wedges[0].get_paths()) == sum(1 for u, v in gw.edges if u != v)
+    assert 'Not drawing labels' in caplog.text